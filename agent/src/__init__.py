@@ -0,0 +1,4 @@
+import time
+
+# Reference point for the startup timings reported by the agent
+STARTED_AT = time.perf_counter()
@@ -0,0 +1,331 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict
+from functools import lru_cache
+from typing import Any
+
+from uagents import Context
+
+from src.config import get_config
+from src.dataclasses import Checkpoint
+from src.sandbox import directory_size
+from src.store import SharedStore, get_shared_store
+from src.workspace import WorkspaceManager, get_workspace_manager
+
+config = get_config()
+
+# Build stages in the order they run; a checkpoint records the last one that completed
+STAGES = ("generate", "archive", "upload")
+
+STATE_FILE = "state.json"
+
+# How often a duplicate request checks whether the running build has finished
+LOCK_POLL_INTERVAL = 1.0
+
+
+def fingerprint(params: dict[str, Any]) -> str:
+    """Hashes the build parameters so a retry only resumes a build of the same project."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class CheckpointStore:
+    """Keeps each build's intermediate outputs on disk, keyed by its request id.
+
+    A retried request with the same id resumes after the last stage that completed,
+    so a failed upload doesn't repeat a long generate step. Completed builds keep only
+    their published URL, which makes retries of a successful request idempotent.
+    """
+
+    def __init__(
+        self, workspace: WorkspaceManager, ttl: int, store: SharedStore | None = None
+    ):
+        self.workspace = workspace
+        self.root = workspace.path("checkpoints")
+        self.ttl = ttl
+        self.store = store
+        # Parsed LLM decisions by checkpoint key, as (saved at, decision)
+        self.decisions: dict[str, tuple[float, dict[str, Any]]] = {}
+        self.decisions_lock = threading.Lock()
+        self.building: set[str] = set()
+        self.building_changed = threading.Condition()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(job_id: str | None) -> str:
+        # Request ids come from clients, so never use them as paths directly
+        return hashlib.sha256((job_id or uuid.uuid4().hex).encode()).hexdigest()[:32]
+
+    def remember_decision(self, job_id: str | None, decision: dict[str, Any]) -> None:
+        """Keeps the parsed LLM decision of a request for as long as its checkpoint.
+
+        A retry replays it instead of asking the LLM again, which could pick another
+        project name or template and so miss the checkpoint.
+        """
+        if not job_id:
+            return
+        key = self.key(job_id)
+        if self.store:
+            self.store.set(f"decision:{key}", decision, self.ttl)
+            return
+        with self.decisions_lock:
+            self.decisions[key] = (time.time(), decision)
+
+    def recall_decision(self, job_id: str | None) -> dict[str, Any] | None:
+        """Returns the decision remembered for a request, if it hasn't expired."""
+        if not job_id:
+            return None
+        key = self.key(job_id)
+        if self.store:
+            return self.store.get(f"decision:{key}")
+        with self.decisions_lock:
+            saved_at, decision = self.decisions.get(key, (0.0, None))
+        return decision if time.time() - saved_at < self.ttl else None
+
+    @contextmanager
+    def lock(self, ctx: Context, job_id: str | None):
+        """Holds a request's checkpoint for the duration of one build.
+
+        A duplicate of an in-flight request waits here for the running build to finish,
+        then resumes from its checkpoint (usually just returning the published URL)
+        instead of rebuilding into the same directory. With a shared store the lock
+        is a one-slot lease, so duplicates sent to different workers wait too.
+
+        Args:
+            ctx (Context): The agent context object.
+            job_id (str | None): Idempotency key of the request. Builds without one
+                get a throwaway checkpoint, so they need no lock.
+        """
+        if not job_id:
+            yield
+            return
+
+        key = self.key(job_id)
+        if self.store:
+            slot, owner = f"checkpoint:{key}", uuid.uuid4().hex
+            if not self.store.acquire_slot(slot, 1, owner):
+                ctx.logger.info("Waiting for an in-flight build of the same request")
+                while not self.store.acquire_slot(slot, 1, owner):
+                    time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                self.store.release_slot(slot, owner)
+            return
+
+        with self.building_changed:
+            if key in self.building:
+                ctx.logger.info("Waiting for an in-flight build of the same request")
+                self.building_changed.wait_for(lambda: key not in self.building)
+            self.building.add(key)
+        try:
+            yield
+        finally:
+            with self.building_changed:
+                self.building.discard(key)
+                self.building_changed.notify_all()
+
+    def load(self, directory: str) -> Checkpoint | None:
+        try:
+            with open(os.path.join(directory, STATE_FILE)) as f:
+                return Checkpoint(directory=directory, **json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def open(
+        self, ctx: Context, job_id: str | None, params: dict[str, Any]
+    ) -> Checkpoint:
+        """Returns the checkpoint to build into, resuming a matching earlier attempt.
+
+        Must be called under `lock`, so no other build of the request is using it.
+
+        Args:
+            ctx (Context): The agent context object.
+            job_id (str | None): Idempotency key of the request. Without one the
+                build can't be retried, so it gets a throwaway checkpoint.
+            params (dict[str, Any]): Everything that determines the build's output.
+
+        Returns:
+            Checkpoint: The checkpoint, with `stage` set to the last completed stage.
+
+        Raises:
+            WorkspaceFull: If the workspace is over budget even after evicting the
+                intermediates of failed builds.
+        """
+        directory = os.path.join(self.root, self.key(job_id))
+        expected = fingerprint(params)
+
+        checkpoint = self.load(directory)
+        if checkpoint and checkpoint.fingerprint == expected and self.valid(checkpoint):
+            ctx.logger.info(f"Resuming build after completed stage: {checkpoint.stage}")
+            checkpoint.owner = os.getpid()
+            self.save(checkpoint)
+            return checkpoint
+
+        if self.workspace.over_budget():
+            self.evict(ctx)
+        self.workspace.check_budget()
+
+        self.workspace.discard(directory)
+        os.makedirs(self.workdir(directory))
+        checkpoint = Checkpoint(
+            directory=directory, fingerprint=expected, owner=os.getpid()
+        )
+        self.save(checkpoint)
+        return checkpoint
+
+    def valid(self, checkpoint: Checkpoint) -> bool:
+        # A stage only counts as done if its output is still there to build on, and an
+        # interrupted generate leaves a half-built workdir that must start over
+        if checkpoint.stage is None:
+            return False
+        if checkpoint.stage == "generate":
+            return os.path.isdir(self.workdir(checkpoint.directory))
+        if checkpoint.stage == "archive":
+            return bool(checkpoint.archive) and os.path.isfile(checkpoint.archive)
+        return checkpoint.stage != "upload" or bool(checkpoint.url)
+
+    @staticmethod
+    def workdir(directory: str) -> str:
+        return os.path.join(directory, "workdir")
+
+    def done(self, checkpoint: Checkpoint, stage: str) -> bool:
+        if checkpoint.stage is None:
+            return False
+        return STAGES.index(checkpoint.stage) >= STAGES.index(stage)
+
+    def complete(self, checkpoint: Checkpoint, stage: str, **outputs: str) -> None:
+        """Records a stage as completed, along with any outputs later stages need."""
+        checkpoint.stage = stage
+        for name, value in outputs.items():
+            setattr(checkpoint, name, value)
+        self.save(checkpoint)
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        state = asdict(checkpoint)
+        del state["directory"]
+        path = os.path.join(checkpoint.directory, STATE_FILE)
+        # Write then rename, so a crash mid-write never leaves a corrupt checkpoint
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    def release(self, ctx: Context, checkpoint: Checkpoint, retryable: bool) -> None:
+        """Drops intermediate outputs the build no longer needs.
+
+        Args:
+            ctx (Context): The agent context object.
+            checkpoint (Checkpoint): The build's checkpoint.
+            retryable (bool): Whether the request can be retried under the same id.
+                Failed retryable builds keep everything until the checkpoint expires.
+        """
+        if not retryable or checkpoint.stage is None:
+            # Nothing a retry could resume from
+            self.workspace.discard(checkpoint.directory)
+        elif self.done(checkpoint, "upload"):
+            # Only the published URL is needed to answer a retry
+            self.workspace.discard(self.workdir(checkpoint.directory))
+            if checkpoint.archive:
+                self.workspace.discard(checkpoint.archive)
+        else:
+            ctx.logger.info(
+                f"Keeping build checkpoint for {self.ttl}s: {checkpoint.directory}"
+            )
+
+    def purge_expired(self, ctx: Context) -> int:
+        """Deletes checkpoints not updated within the TTL and returns how many."""
+        cutoff = time.time() - self.ttl
+        purged = 0
+
+        with self.decisions_lock:
+            for key in [
+                key
+                for key, (saved_at, _) in self.decisions.items()
+                if saved_at < cutoff
+            ]:
+                del self.decisions[key]
+
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                try:
+                    updated_at = os.stat(os.path.join(entry.path, STATE_FILE)).st_mtime
+                except FileNotFoundError:
+                    updated_at = entry.stat().st_mtime
+                if updated_at < cutoff:
+                    self.workspace.discard(entry.path)
+                    purged += 1
+
+        return purged
+
+    def evict(self, ctx: Context) -> None:
+        """Frees space by discarding failed builds' intermediates, oldest first.
+
+        Each eviction lowers the workspace's measured usage by the checkpoint's size
+        right away, so the budget check doesn't wait for the next measurement.
+        """
+        resumable = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                checkpoint = self.load(entry.path)
+                if checkpoint and checkpoint.stage in ("generate", "archive"):
+                    updated_at = os.stat(os.path.join(entry.path, STATE_FILE)).st_mtime
+                    resumable.append((updated_at, checkpoint))
+
+        for _, checkpoint in sorted(resumable, key=lambda item: item[0]):
+            if not self.workspace.over_budget():
+                return
+            size_mb = directory_size(checkpoint.directory) / 1024 / 1024
+            self.workspace.discard(checkpoint.directory)
+            self.workspace.usage_mb -= size_mb
+            ctx.logger.warning(
+                f"Evicted build checkpoint to stay within the workspace budget: {checkpoint.directory}"
+            )
+
+    def collect_orphans(self, ctx: Context) -> int:
+        """Discards half-built checkpoints left by workers that crashed mid-generate.
+
+        Run at startup, when this process can't own any build yet, so a checkpoint
+        owned by a recycled pid equal to ours is an orphan too.
+
+        Returns:
+            int: The number of checkpoints discarded.
+        """
+        collected = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                checkpoint = self.load(entry.path)
+                if checkpoint and (
+                    checkpoint.stage is not None or self.owner_alive(checkpoint)
+                ):
+                    continue
+                self.workspace.discard(entry.path)
+                collected += 1
+
+        if collected:
+            ctx.logger.info(f"Collected {collected} orphaned build workspace(s)")
+        return collected
+
+    @staticmethod
+    def owner_alive(checkpoint: Checkpoint) -> bool:
+        if not checkpoint.owner or checkpoint.owner == os.getpid():
+            return False
+        try:
+            os.kill(checkpoint.owner, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+
+@lru_cache
+def get_checkpoint_store() -> CheckpointStore:
+    return CheckpointStore(
+        get_workspace_manager(), config.CHECKPOINT_TTL, store=get_shared_store()
+    )
@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -16,6 +16,50 @@ class Configuration(BaseSettings):
     MODEL: Optional[str] = "mistral-large-latest"
     RATE_LIMIT_CALLS: Optional[int] = 20
     RATE_LIMIT_PERIOD: Optional[int] = 60
+    SESSION_MAX_COUNT: Optional[int] = 1000
+    SESSION_TTL: Optional[int] = 1800
+    SESSION_RECENT_TURNS: Optional[int] = 4
+    SESSION_TOKEN_BUDGET: Optional[int] = 600
+    BUILD_CONCURRENCY: Optional[int] = 4
+    BUILD_TOOLCHAIN_CAPS: Optional[dict[str, int]] = {
+        "vite": 4,
+        "django": 2,
+        "composer": 1,
+        "rails": 1,
+    }
+    BUILD_AGING_RATE: Optional[float] = 0.5
+    BUILD_MAX_QUEUE_WAIT: Optional[int] = 600
+    PROGRESS_MAX_EVENTS: Optional[int] = 500
+    PROGRESS_TTL: Optional[int] = 900
+    PROGRESS_POLL_TIMEOUT: Optional[int] = 20
+    SANDBOX_CPU_SECONDS: Optional[int] = 900
+    SANDBOX_MEMORY_MB: Optional[int] = 4096
+    SANDBOX_WALL_SECONDS: Optional[int] = 1200
+    SANDBOX_DISK_MB: Optional[int] = 4096
+    SANDBOX_CHECK_INTERVAL: Optional[float] = 2.0
+    SANDBOX_DISK_CHECK_INTERVAL: Optional[float] = 10.0
+    TOOLCHAIN_REFRESH_INTERVAL: Optional[int] = 21600
+    TOOLCHAIN_RESOLVE_TIMEOUT: Optional[int] = 15
+    WORKERS: Optional[int] = None
+    WORKER_ID: Optional[int] = 0
+    SHARED_STORE_PATH: Optional[str] = None
+    HEALTH_INTERVAL: Optional[int] = 10
+    LEDGER_CHECK: Optional[Literal["background", "blocking", "off"]] = "background"
+    STORAGE_BACKEND: Optional[Literal["s3", "local"]] = "s3"
+    S3_BUCKET: Optional[str] = "forge-projects"
+    S3_MAX_CONCURRENCY: Optional[int] = 10
+    S3_MULTIPART_THRESHOLD_MB: Optional[int] = 8
+    LOCAL_STORAGE_DIR: Optional[str] = "/tmp/forge-artifacts"
+    LOCAL_STORAGE_PORT: Optional[int] = 8001
+    LOCAL_STORAGE_URL: Optional[str] = None
+    LOCAL_STORAGE_SERVE: Optional[bool] = True
+    ARTIFACT_TTL: Optional[int] = 86400
+    ARTIFACT_PURGE_INTERVAL: Optional[int] = 3600
+    WORKSPACE_ROOT: Optional[str] = "/tmp/forge-workspaces"
+    WORKSPACE_BUDGET_MB: Optional[int] = 20480
+    WORKSPACE_CHECK_INTERVAL: Optional[float] = 30.0
+    PACKAGE_CACHE_BUDGET_MB: Optional[int] = 5120
+    CHECKPOINT_TTL: Optional[int] = 3600
     HOME_PATH: str
     GEM_PATH: str
     GEM_HOME: str
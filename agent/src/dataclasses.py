@@ -1,5 +1,8 @@
-from dataclasses import dataclass
-from typing import Callable, Literal
+import asyncio
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal, Optional
 
 
 @dataclass
@@ -50,3 +53,67 @@ class ComposerConfig:
         "silverstripe",
     ]
     project_name: str = "myproject"
+
+
+@dataclass
+class Turn:
+    user_input: str
+    action: Optional[str] = None
+    action_args: Optional[dict[str, Any]] = None
+    result: Optional[str] = None
+    response: Optional[str] = None
+
+
+@dataclass
+class Session:
+    updated_at: float
+    turns: list[Turn] = field(default_factory=list)
+    summary: list[str] = field(default_factory=list)
+
+
+@dataclass
+class BuildJob:
+    toolchain: str
+    template: str
+    estimated_cost: float
+    submitted_at: float
+    started_at: Optional[float] = None
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # Set once the project was actually generated, not resumed from a checkpoint
+    built: bool = False
+
+
+@dataclass
+class ProgressLog:
+    updated_at: float
+    events: deque
+    next_seq: int = 0
+    done: bool = False
+
+
+@dataclass
+class SandboxLimits:
+    cpu_seconds: int = 0
+    memory_mb: int = 0
+    wall_seconds: int = 0
+    disk_mb: int = 0
+
+
+@dataclass
+class ResourceUsage:
+    cpu_seconds: float = 0.0
+    max_rss_mb: float = 0.0
+    disk_mb: float = 0.0
+    wall_seconds: float = 0.0
+    violation: Optional[str] = None
+
+
+@dataclass
+class Checkpoint:
+    directory: str
+    fingerprint: str
+    stage: Optional[str] = None
+    archive: Optional[str] = None
+    url: Optional[str] = None
+    owner: Optional[int] = None
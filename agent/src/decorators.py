@@ -1,3 +1,4 @@
+import asyncio
 from functools import wraps
 
 from backoff import expo, on_exception
@@ -7,12 +8,32 @@ from uagents import Context
 
 from src.config import get_config
 from src.schemas import Request, Response
+from src.store import get_shared_store
 
 config = get_config()
 
 
+def shared_limits(calls: int, period: int):
+    """Like ratelimit.limits, but counts calls across all worker processes via the shared store."""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            hits = await asyncio.to_thread(
+                get_shared_store().hit, f"ratelimit:{func.__name__}", period
+            )
+            if hits > calls:
+                raise RateLimitException("too many calls", period)
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 def ratelimit(func):
-    limited = limits(calls=config.RATE_LIMIT_CALLS, period=config.RATE_LIMIT_PERIOD)(
+    limiter = shared_limits if get_shared_store() else limits
+    limited = limiter(calls=config.RATE_LIMIT_CALLS, period=config.RATE_LIMIT_PERIOD)(
         func
     )
     limited_with_retry = on_exception(expo, RateLimitException, max_tries=8)(limited)
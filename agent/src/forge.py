@@ -1,12 +1,41 @@
-from cosmpy.aerial.client import LedgerClient, NetworkConfig
+import asyncio
+import os
+import resource
+import time
+
 from uagents import Agent, Context
 
+from src import STARTED_AT
+from src.checkpoints import get_checkpoint_store
 from src.config import get_config
 from src.decorators import ratelimit
-from src.schemas import Request, Response
+from src.progress import get_progress_channel
+from src.scheduler import BuildQueueFull, get_build_scheduler
+from src.schemas import (
+    HealthResponse,
+    ProgressEvent,
+    ProgressRequest,
+    ProgressResponse,
+    Request,
+    Response,
+    WorkerHealth,
+)
+from src.sessions import get_session_store
+from src.store import get_shared_store
+from src.toolchain import get_toolchain_registry
+from src.utils import get_storage_backend
+from src.workspace import WorkspaceFull, get_workspace_manager
 
 config = get_config()
 
+IMPORT_SECONDS = time.perf_counter() - STARTED_AT
+
+# Keeps references to fire-and-forget startup tasks so they aren't garbage collected
+background_tasks: set[asyncio.Task] = set()
+
+# Number of /chat requests this worker has answered, reported in its heartbeat
+requests_served = 0
+
 
 agent = Agent(
     name=config.NAME,
@@ -31,10 +60,214 @@ async def handle_startup(ctx: Context) -> None:
     ctx.logger.info(
         f"Hello, I'm agent {agent.name} and my address is {agent.address}. My wallet address is {agent.wallet.address()}"
     )
+
+    # Runs before any build, so half-built workspaces of crashed builds can be told apart
+    await asyncio.to_thread(get_checkpoint_store().collect_orphans, ctx)
+
+    if config.LEDGER_CHECK == "blocking":
+        await check_wallet_balance(ctx)
+    elif config.LEDGER_CHECK == "background":
+        task = asyncio.create_task(check_wallet_balance(ctx))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    ctx.logger.info(
+        f"Agent ready in {time.perf_counter() - STARTED_AT:.2f}s (imports: {IMPORT_SECONDS:.2f}s)"
+    )
+
+
+def query_wallet_balance(address: str) -> list:
+    """
+    Queries the wallet balances from the Fetch.ai testnet ledger.
+
+    Args:
+        address (str): The wallet address to query.
+
+    Returns:
+        list: The coins held by the wallet.
+    """
+    from cosmpy.aerial.client import LedgerClient, NetworkConfig
+
     ledger_client = LedgerClient(NetworkConfig.fetchai_stable_testnet())
-    address = agent.wallet.address()
-    balances = ledger_client.query_bank_all_balances(address)
-    ctx.logger.info(f"Wallet balance: {balances}")
+    return ledger_client.query_bank_all_balances(address)
+
+
+async def check_wallet_balance(ctx: Context) -> None:
+    """
+    Logs the agent's wallet balance without blocking the event loop.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        None: This function doesn't return anything.
+    """
+    started = time.perf_counter()
+    try:
+        balances = await asyncio.to_thread(query_wallet_balance, agent.wallet.address())
+        ctx.logger.info(
+            f"Wallet balance: {balances} (ledger query took {time.perf_counter() - started:.2f}s)"
+        )
+    except Exception as e:
+        ctx.logger.warning(f"Wallet balance check failed: {e}")
+
+
+async def claim_periodic_work(name: str, interval: float) -> bool:
+    """
+    Decides whether this worker should run a host-wide periodic job.
+
+    With a shared store only the worker holding the job's lease runs it, so N
+    workers don't each hit the registries or sweep storage. A lone worker always does.
+
+    Args:
+        name (str): The periodic job's name.
+        interval (float): How often the job runs, in seconds.
+
+    Returns:
+        bool: True if this worker should run the job now.
+    """
+    store = get_shared_store()
+    if store is None:
+        return True
+    # Outlive one interval so the holder keeps the lease across its own runs
+    return await asyncio.to_thread(store.claim, f"lease:{name}", interval * 1.5)
+
+
+@agent.on_interval(period=config.ARTIFACT_PURGE_INTERVAL)
+async def purge_artifacts(ctx: Context) -> None:
+    """
+    Interval handler that deletes published archives older than ARTIFACT_TTL.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        None: This function doesn't return anything.
+    """
+    if not config.ARTIFACT_TTL or not await claim_periodic_work(
+        "purge_artifacts", config.ARTIFACT_PURGE_INTERVAL
+    ):
+        return
+
+    purged = await asyncio.to_thread(get_storage_backend().purge_expired, ctx)
+    if purged:
+        ctx.logger.info(f"Purged {purged} expired artifact(s)")
+
+
+@agent.on_interval(period=config.ARTIFACT_PURGE_INTERVAL)
+async def purge_checkpoints(ctx: Context) -> None:
+    """
+    Interval handler that deletes build checkpoints older than CHECKPOINT_TTL.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        None: This function doesn't return anything.
+    """
+    if not await claim_periodic_work(
+        "purge_checkpoints", config.ARTIFACT_PURGE_INTERVAL
+    ):
+        return
+
+    purged = await asyncio.to_thread(get_checkpoint_store().purge_expired, ctx)
+    if purged:
+        ctx.logger.info(f"Purged {purged} expired build checkpoint(s)")
+
+
+@agent.on_interval(period=config.ARTIFACT_PURGE_INTERVAL)
+async def trim_package_cache(ctx: Context) -> None:
+    """
+    Interval handler that trims the shared package cache to PACKAGE_CACHE_BUDGET_MB.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        None: This function doesn't return anything.
+    """
+    if not config.PACKAGE_CACHE_BUDGET_MB or not await claim_periodic_work(
+        "trim_package_cache", config.ARTIFACT_PURGE_INTERVAL
+    ):
+        return
+
+    deleted = await asyncio.to_thread(
+        get_workspace_manager().trim_cache, config.PACKAGE_CACHE_BUDGET_MB
+    )
+    if deleted:
+        ctx.logger.info(f"Trimmed {deleted} file(s) from the package cache")
+
+
+@agent.on_interval(period=config.TOOLCHAIN_REFRESH_INTERVAL)
+async def refresh_toolchain_versions(ctx: Context) -> None:
+    """
+    Interval handler that re-resolves the scaffolder versions builds are pinned to.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        None: This function doesn't return anything.
+    """
+    registry = get_toolchain_registry()
+    if await claim_periodic_work(
+        "refresh_toolchain", config.TOOLCHAIN_REFRESH_INTERVAL
+    ):
+        await asyncio.to_thread(registry.refresh, ctx)
+    elif not await asyncio.to_thread(lambda: registry.versions):
+        ctx.logger.info("Toolchain versions are refreshed by another worker")
+
+
+def worker_health() -> WorkerHealth:
+    """
+    Collects this worker's health snapshot.
+
+    Returns:
+        WorkerHealth: Process, traffic and build queue figures for this worker.
+    """
+    scheduler = get_build_scheduler()
+    workspace = get_workspace_manager().report()
+    return WorkerHealth(
+        worker_id=config.WORKER_ID,
+        pid=os.getpid(),
+        # uagents falls back to port 8000 when PORT is unset
+        port=agent._port,
+        uptime=time.perf_counter() - STARTED_AT,
+        # ru_maxrss is reported in KiB on Linux
+        rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        requests=requests_served,
+        running_builds=len(scheduler.running),
+        queued_builds=len(scheduler.pending),
+        workspace_used_mb=workspace["used_mb"],
+        workspace_free_mb=workspace["free_mb"],
+    )
+
+
+@agent.on_interval(period=config.HEALTH_INTERVAL)
+async def publish_health(ctx: Context) -> None:
+    """
+    Interval handler that publishes this worker's heartbeat to the shared store.
+
+    Heartbeats expire after a few missed intervals, so dead workers drop out of /health.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        None: This function doesn't return anything.
+    """
+    store = get_shared_store()
+    if store is None:
+        return
+
+    await asyncio.to_thread(
+        store.set,
+        f"health:{config.WORKER_ID}",
+        worker_health().dict(),
+        config.HEALTH_INTERVAL * 3,
+    )
+    if await claim_periodic_work("purge_store", config.HEALTH_INTERVAL):
+        await asyncio.to_thread(store.purge, config.PROGRESS_TTL)
 
 
 @agent.on_rest_post("/chat", Request, Response)
@@ -52,20 +285,83 @@ async def handle_post(ctx: Context, req: Request) -> Response:
     """
     from src.react import begin_react_loop
 
+    global requests_served
+    requests_served += 1
+
     if not req.query:
         return Response(status="error", message="Query is empty")
 
+    sessions = get_session_store()
+    # Session and progress state may live in the shared store, so keep its
+    # blocking SQLite calls off the event loop
+    history = (
+        await asyncio.to_thread(sessions.render, req.session_id)
+        if req.session_id
+        else ""
+    )
+    progress = get_progress_channel()
+    # A retry reuses the request id, so its progress log may already be closed
+    await asyncio.to_thread(progress.open, req.request_id)
+
     try:
-        data = await begin_react_loop(ctx, req.query)
+        data = await begin_react_loop(ctx, req.query, history, req.request_id)
+        if req.session_id:
+            await asyncio.to_thread(sessions.record, req.session_id, req.query, data)
+
         if data["action"]:
             return Response(
                 status="success", message="Project scaffolded successfully", data=data
             )
 
         return Response(status="success", message=data["response"])
+    except (BuildQueueFull, WorkspaceFull) as e:
+        return Response(status="error", message=str(e))
     except Exception as e:
         ctx.logger.error(f"Error in ReAct loop: {e}")
         return Response(status="error", message=str(e))
+    finally:
+        await asyncio.to_thread(progress.close, req.request_id)
+
+
+@agent.on_rest_post("/progress", ProgressRequest, ProgressResponse)
+async def handle_progress(ctx: Context, req: ProgressRequest) -> ProgressResponse:
+    """
+    Long-polls build events for a /chat request, returning those after the cursor.
+
+    Args:
+        ctx (Context): The agent context object.
+        req (ProgressRequest): The request id being followed and the last seen event.
+
+    Returns:
+        ProgressResponse: New events, the cursor to send next, and whether the build is done.
+    """
+    events, cursor, done = await get_progress_channel().wait(
+        req.request_id, req.cursor, config.PROGRESS_POLL_TIMEOUT
+    )
+    return ProgressResponse(
+        events=[ProgressEvent(**event) for event in events], cursor=cursor, done=done
+    )
+
+
+@agent.on_rest_get("/health", HealthResponse)
+async def handle_health(ctx: Context) -> HealthResponse:
+    """
+    Handles GET requests to the /health endpoint.
+
+    Args:
+        ctx (Context): The agent context object.
+
+    Returns:
+        HealthResponse: The latest heartbeat of every live worker, or just this one's
+            when running without a shared store.
+    """
+    store = get_shared_store()
+    if store is None:
+        return HealthResponse(workers=[worker_health()])
+
+    heartbeats = await asyncio.to_thread(store.get_prefix, "health:")
+    workers = [WorkerHealth(**health) for health in heartbeats.values()]
+    return HealthResponse(workers=sorted(workers, key=lambda w: w.worker_id))
 
 
 @agent.on_message(Request)
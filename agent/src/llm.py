@@ -1,13 +1,24 @@
-from typing import Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
-from openai import AsyncOpenAI, OpenAIError
 from uagents import Context
 
 from src.config import get_config
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 config = get_config()
 
 
+@lru_cache
+def get_llm_client() -> "AsyncOpenAI":
+    """Returns the process-wide LLM client, importing the OpenAI SDK on first use."""
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=config.LLM_API_KEY, base_url=config.LLM_API_URL)
+
+
 async def call_llm(ctx: Context, content: str, role: str = "user") -> dict[str, Any]:
     """Makes an asynchronous API call to a large language model service.
 
@@ -30,6 +41,8 @@ async def call_llm(ctx: Context, content: str, role: str = "user") -> dict[str,
                 >>> response = await call_llm("Create a new Flask project")
                 >>> print(response.choices[0].message.content)
     """
+    from openai import OpenAIError
+
     data = {
         "messages": [
             {
@@ -45,8 +58,7 @@ async def call_llm(ctx: Context, content: str, role: str = "user") -> dict[str,
     }
 
     try:
-        client = AsyncOpenAI(api_key=config.LLM_API_KEY, base_url=config.LLM_API_URL)
-        response = await client.chat.completions.create(
+        response = await get_llm_client().chat.completions.create(
             model=data["model"],
             messages=data["messages"],
             stream=False,
@@ -0,0 +1,384 @@
+"""Load generator for the /chat handler.
+
+Drives ``handle_post`` in-process with a mixed workload against a fake
+OpenAI-compatible LLM server and local artifact storage, then reports
+throughput, latency percentiles, error/rate-limit/shed rates and host usage.
+
+Usage:
+    python -m src.loadtest --concurrency 20 --duration 60
+    python -m src.loadtest --rate 5 --duration 60 --mix chat=0.6,vite=0.3,rails=0.1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import resource
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KINDS = ("chat", "vite", "django", "composer", "rails")
+
+DEFAULT_MIX = "chat=0.5,vite=0.2,django=0.1,composer=0.1,rails=0.1"
+
+QUERIES = {
+    "chat": "What's the difference between Django and Flask?",
+    "vite": "Create a React TypeScript project with npm called {name}",
+    "django": "Create a new Django project called {name}",
+    "composer": "Create a Laravel project called {name}",
+    "rails": "Create a Rails project called {name}",
+}
+
+ACTION_ARGS = {
+    "vite": ("scaffold_vite", {"template": "react-ts", "package_manager": "npm"}),
+    "django": ("scaffold_django", {}),
+    "composer": ("scaffold_composer", {"template": "laravel"}),
+    "rails": ("scaffold_rails", {}),
+}
+
+PROJECT_NAME = re.compile(r"called (lt-(\w+)-\d+)")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def fake_completion(prompt: str) -> str:
+    """Answers a ReAct prompt the way the real model would for the load-test queries."""
+    # The current request is the last "User:" line; earlier ones are session history
+    current = prompt.rsplit("\nUser: ", 1)[-1].split("\n", 1)[0]
+    match = PROJECT_NAME.search(current)
+    if not match:
+        return (
+            "Thought: User is asking for information about web frameworks\n"
+            "Response: Django is a batteries-included framework, Flask is a minimal one."
+        )
+
+    name, kind = match.groups()
+    action, args = ACTION_ARGS[kind]
+    return (
+        f"Thought: User wants a {kind} project named {name}\n"
+        f"Action: {action}\n"
+        f"Action Args: {json.dumps({'project_name': name, **args})}"
+    )
+
+
+def start_fake_llm(latency: float) -> ThreadingHTTPServer:
+    """Starts an OpenAI-compatible chat completions server on a free local port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(random.expovariate(1 / latency) if latency else 0)
+            payload = json.dumps(
+                {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {
+                                "role": "assistant",
+                                "content": fake_completion(
+                                    body["messages"][-1]["content"]
+                                ),
+                            },
+                        }
+                    ],
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def simulated_build(toolchain: str, scale: float):
+    """Returns a scaffold stand-in that sleeps in a sandbox for a scaled typical build time."""
+    from src.scheduler import DEFAULT_COSTS
+    from src.tools import build_project
+
+    def build(ctx, job_id=None, **kwargs) -> str:
+        config = kwargs.get("vite_config") or kwargs.get("composer_config")
+        project_name = config.project_name if config else kwargs["project_name"]
+
+        def generate(sandbox, temp_dir: str) -> None:
+            sandbox.run(
+                f"mkdir {project_name} && sleep {DEFAULT_COSTS[toolchain] * scale}",
+                cwd=temp_dir,
+            )
+
+        return build_project(ctx, job_id, project_name, {}, {}, generate)
+
+    return build
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)), 1) - 1]
+
+
+def classify(message: str, status: str) -> str:
+    if message.startswith("Rate limit exceeded"):
+        return "rate_limited"
+    if message.startswith("Forge is busy"):
+        return "shed"
+    return "ok" if status == "success" else "error"
+
+
+class HostSampler:
+    """Samples this process's RSS while the test runs."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.samples: list[float] = []
+
+    @staticmethod
+    def rss_mb() -> float:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            self.samples.append(self.rss_mb())
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    from src.forge import handle_post
+    from src.react import ACTIONS
+    from src.schemas import Request
+
+    if not args.real_builds:
+        from src.scheduler import DEFAULT_COSTS, get_build_scheduler
+
+        scheduler = get_build_scheduler()
+        for kind, (action, action_args) in ACTION_ARGS.items():
+            ACTIONS[action].function = simulated_build(kind, args.sim_scale)
+            # Estimate simulated builds at their scaled length, not a real build's, so
+            # the unscaled priors don't shed them before any timing history exists
+            template = action_args.get("template", kind)
+            scheduler.timings[f"{kind}:{template}"] = (
+                DEFAULT_COSTS[kind] * args.sim_scale
+            )
+
+    class LoadTestContext:
+        logger = logging.getLogger("loadtest")
+
+    ctx = LoadTestContext()
+    mix = {
+        kind: float(weight)
+        for kind, weight in (item.split("=") for item in args.mix.split(","))
+    }
+    kinds, weights = list(mix), list(mix.values())
+    results: dict[str, list[tuple[str, float]]] = defaultdict(list)
+    counter = 0
+
+    async def send(session_id: str) -> None:
+        nonlocal counter
+        counter += 1
+        kind = random.choices(kinds, weights)[0]
+        query = QUERIES[kind].format(name=f"lt-{kind}-{counter}")
+        started = time.perf_counter()
+        try:
+            response = await handle_post(
+                ctx,
+                Request(
+                    query=query, session_id=session_id, request_id=uuid.uuid4().hex
+                ),
+            )
+            outcome = classify(response.message, response.status)
+        except Exception:
+            outcome = "error"
+        results[kind].append((outcome, time.perf_counter() - started))
+
+    deadline = time.monotonic() + args.duration
+    usage_before = (
+        resource.getrusage(resource.RUSAGE_SELF),
+        resource.getrusage(resource.RUSAGE_CHILDREN),
+    )
+    sampler = HostSampler()
+    stop = asyncio.Event()
+    sampling = asyncio.create_task(sampler.run(stop))
+    started = time.perf_counter()
+
+    if args.rate:
+        # Open loop: Poisson arrivals regardless of how many requests are in flight
+        in_flight = set()
+        while time.monotonic() < deadline:
+            task = asyncio.create_task(send(uuid.uuid4().hex))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            await asyncio.sleep(random.expovariate(args.rate))
+        await asyncio.gather(*in_flight)
+    else:
+        # Closed loop: each virtual user sends its next request when the last returns
+        async def user() -> None:
+            session_id = uuid.uuid4().hex
+            while time.monotonic() < deadline:
+                await send(session_id)
+
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampling
+    usage_after = (
+        resource.getrusage(resource.RUSAGE_SELF),
+        resource.getrusage(resource.RUSAGE_CHILDREN),
+    )
+    cpu_seconds = sum(
+        (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+        for before, after in zip(usage_before, usage_after)
+    )
+
+    def summarise(samples: list[tuple[str, float]]) -> dict:
+        latencies = [latency for _, latency in samples]
+        outcomes = [outcome for outcome, _ in samples]
+        total = len(samples) or 1
+        return {
+            "requests": len(samples),
+            "throughput_rps": len(samples) / elapsed,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "p99_s": percentile(latencies, 99),
+            "error_rate": outcomes.count("error") / total,
+            "rate_limited_rate": outcomes.count("rate_limited") / total,
+            "shed_rate": outcomes.count("shed") / total,
+        }
+
+    return {
+        "mode": (
+            f"open loop {args.rate}/s"
+            if args.rate
+            else f"closed loop x{args.concurrency}"
+        ),
+        "duration_s": elapsed,
+        "overall": summarise([sample for kind in results.values() for sample in kind]),
+        "by_kind": {
+            kind: summarise(samples) for kind, samples in sorted(results.items())
+        },
+        "host": {
+            "cpu_seconds": cpu_seconds,
+            "avg_cores": cpu_seconds / elapsed,
+            "rss_avg_mb": sum(sampler.samples) / max(len(sampler.samples), 1),
+            "rss_peak_mb": max(sampler.samples, default=0.0),
+            "load_avg_1m": os.getloadavg()[0],
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\nForge /chat load test ({report['mode']}, {report['duration_s']:.1f}s)\n")
+    header = f"{'workload':<10}{'reqs':>7}{'rps':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'err':>7}{'rl':>7}{'shed':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in [*report["by_kind"].items(), ("overall", report["overall"])]:
+        print(
+            f"{name:<10}{stats['requests']:>7}{stats['throughput_rps']:>8.2f}"
+            f"{stats['p50_s']:>7.2f}s{stats['p95_s']:>7.2f}s{stats['p99_s']:>7.2f}s"
+            f"{stats['error_rate']:>7.1%}{stats['rate_limited_rate']:>7.1%}{stats['shed_rate']:>7.1%}"
+        )
+    host = report["host"]
+    print(
+        f"\nhost: {host['avg_cores']:.2f} cores avg ({host['cpu_seconds']:.1f} cpu-s), "
+        f"rss avg {host['rss_avg_mb']:.0f}MB / peak {host['rss_peak_mb']:.0f}MB, "
+        f"load avg {host['load_avg_1m']:.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="virtual users (closed loop)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0, help="arrivals per second (open loop)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="seconds to generate load for"
+    )
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help=f"workload weights, e.g. {DEFAULT_MIX}"
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.5,
+        help="mean fake LLM latency in seconds",
+    )
+    parser.add_argument(
+        "--real-builds", action="store_true", help="run the real scaffold toolchains"
+    )
+    parser.add_argument(
+        "--sim-scale",
+        type=float,
+        default=0.05,
+        help="simulated build time as a fraction of typical",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    for item in args.mix.split(","):
+        if item.split("=")[0] not in KINDS:
+            parser.error(f"unknown workload in --mix: {item}")
+
+    llm = start_fake_llm(args.llm_latency)
+    storage_dir = tempfile.mkdtemp(prefix="forge-loadtest-")
+    # Configuration is read once on first import, so point it at the stand-ins first
+    os.environ.update(
+        {
+            "LLM_API_URL": f"http://127.0.0.1:{llm.server_port}",
+            "LLM_API_KEY": "loadtest",
+            # A throwaway identity, so uagents doesn't write a private_keys.json
+            "SEED": f"forge-loadtest-{uuid.uuid4()}",
+            "STORAGE_BACKEND": "local",
+            "LOCAL_STORAGE_DIR": os.path.join(storage_dir, "artifacts"),
+            "WORKSPACE_ROOT": os.path.join(storage_dir, "workspaces"),
+            "LOCAL_STORAGE_PORT": str(free_port()),
+        }
+    )
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    shutil.rmtree(storage_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from src.config import get_config
+from src.dataclasses import ProgressLog
+from src.store import SharedStore, get_shared_store
+
+config = get_config()
+
+# Longest single output line kept, so one noisy line can't blow the event buffer
+MAX_LINE_LENGTH = 500
+
+
+class ProgressChannel:
+    """Bounded, thread-safe buffers of build events that clients read incrementally.
+
+    Scaffold tools publish from worker threads; the /progress endpoint long-polls
+    with a cursor so each client only receives events it hasn't seen yet.
+    """
+
+    def __init__(self, max_events: int, ttl: int):
+        self.max_events = max_events
+        self.ttl = ttl
+        self.logs: dict[str, ProgressLog] = {}
+        self.lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        for job_id in [
+            job_id
+            for job_id, log in self.logs.items()
+            if now - log.updated_at > self.ttl
+        ]:
+            del self.logs[job_id]
+
+    def publish(self, job_id: str | None, kind: str, message: str) -> None:
+        """Appends an event to a job's log; a no-op when the request has no job id.
+
+        Args:
+            job_id (str | None): Identifier of the request being built.
+            kind (str): "stage" for pipeline stage changes or "log" for tool output.
+            message (str): The stage name or output line.
+        """
+        if not job_id:
+            return
+
+        self.publish_many(job_id, kind, [message])
+
+    def publish_many(self, job_id: str | None, kind: str, messages: list[str]) -> None:
+        """Appends several events of one kind at once, e.g. a batch of output lines."""
+        if not job_id or not messages:
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            log = self.logs.get(job_id)
+            if log is None:
+                self._expire(now)
+                log = self.logs[job_id] = ProgressLog(
+                    updated_at=now, events=deque(maxlen=self.max_events)
+                )
+            log.updated_at = now
+            for message in messages:
+                log.next_seq += 1
+                log.events.append(
+                    {
+                        "seq": log.next_seq,
+                        "kind": kind,
+                        "message": message[:MAX_LINE_LENGTH],
+                    }
+                )
+
+    def stage(self, job_id: str | None, stage: str) -> None:
+        self.publish(job_id, "stage", stage)
+
+    def open(self, job_id: str | None) -> None:
+        """Starts a new attempt at a job, so a retry under the same id isn't reported done.
+
+        Sequence numbers carry on from the previous attempt, so a client still holding
+        that attempt's cursor picks up the new events.
+        """
+        if not job_id:
+            return
+        self.stage(job_id, "started")
+        with self.lock:
+            self.logs[job_id].done = False
+
+    def close(self, job_id: str | None) -> None:
+        if not job_id:
+            return
+        self.stage(job_id, "done")
+        with self.lock:
+            self.logs[job_id].done = True
+
+    def read(self, job_id: str, cursor: int) -> tuple[list[dict], int, bool]:
+        """Returns events newer than the cursor.
+
+        Args:
+            job_id (str): Identifier of the request being built.
+            cursor (int): Sequence number of the last event the client has seen.
+
+        Returns:
+            tuple[list[dict], int, bool]: The new events, the updated cursor and
+                whether the job has finished.
+        """
+        with self.lock:
+            log = self.logs.get(job_id)
+            if log is None:
+                return [], cursor, False
+            events = [event for event in log.events if event["seq"] > cursor]
+            return events, log.next_seq, log.done
+
+    async def wait(
+        self, job_id: str, cursor: int, timeout: float
+    ) -> tuple[list[dict], int, bool]:
+        """Long-polls until new events arrive, the job finishes, or the timeout passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            events, cursor, done = await asyncio.to_thread(self.read, job_id, cursor)
+            if events or done or time.monotonic() >= deadline:
+                return events, cursor, done
+            await asyncio.sleep(0.25)
+
+
+class SharedProgressChannel(ProgressChannel):
+    """Progress channel kept in the shared store, so /progress can be polled on any worker."""
+
+    def __init__(self, store: SharedStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def publish_many(self, job_id: str | None, kind: str, messages: list[str]) -> None:
+        if not job_id or not messages:
+            return
+        self.store.append_many(
+            f"progress:{job_id}",
+            [
+                {"kind": kind, "message": message[:MAX_LINE_LENGTH]}
+                for message in messages
+            ],
+            self.max_events,
+        )
+
+    def open(self, job_id: str | None) -> None:
+        if not job_id:
+            return
+        # Kept apart from the stream, so a cursor past the "done" event still sees it
+        self.store.set(f"progress-done:{job_id}", False, self.ttl)
+        self.stage(job_id, "started")
+
+    def close(self, job_id: str | None) -> None:
+        if not job_id:
+            return
+        self.stage(job_id, "done")
+        self.store.set(f"progress-done:{job_id}", True, self.ttl)
+
+    def read(self, job_id: str, cursor: int) -> tuple[list[dict], int, bool]:
+        events = [
+            {"seq": seq, **item}
+            for seq, item in self.store.read(f"progress:{job_id}", cursor)
+        ]
+        done = bool(self.store.get(f"progress-done:{job_id}"))
+        return events, events[-1]["seq"] if events else cursor, done
+
+
+@lru_cache
+def get_progress_channel() -> ProgressChannel:
+    options = {"max_events": config.PROGRESS_MAX_EVENTS, "ttl": config.PROGRESS_TTL}
+    store = get_shared_store()
+    if store:
+        return SharedProgressChannel(store, **options)
+    return ProgressChannel(**options)
@@ -1,9 +1,13 @@
+import asyncio
 import json
 from typing import Any
 
+from src.checkpoints import get_checkpoint_store
 from src.dataclasses import Action, ComposerConfig, ViteConfig
 from src.forge import Context
 from src.llm import call_llm
+from src.progress import get_progress_channel
+from src.scheduler import get_build_scheduler
 from src.tools import scaffold_composer, scaffold_django, scaffold_rails, scaffold_vite
 
 ACTIONS = {
@@ -90,12 +94,13 @@ Thought: User is asking for information about web frameworks
 Response: Django and Flask are both Python web frameworks but have different philosophies. Django is a full-featured framework that provides many built-in features like admin interface, ORM, and authentication. Flask is a lightweight framework that gives you more flexibility in choosing your tools and architecture...
 
 Current conversation:
-User: {input}
+{history}User: {input}
 
 Remember to:
 1. Respond with Thought/Action/Action Args or Thought/Response.
 2. For frontend projects, infer template type from user request (default to Vanilla JavaScript if not specified)
 3. For frontend projects, use specified package manager or default to npm
+4. Resolve follow-up requests (e.g. "now make it TypeScript") from the earlier conversation, reusing its project name and settings
 """
 
 
@@ -142,13 +147,19 @@ def parse_llm_response(response: str) -> dict[str, Any]:
 
 
 async def begin_react_loop(
-    ctx: Context, user_input: str, max_steps: int = 3
+    ctx: Context,
+    user_input: str,
+    history: str = "",
+    job_id: str | None = None,
+    max_steps: int = 3,
 ) -> dict[str, str]:
     """Execute the reason-action (ReAct) loop to process user input and perform actions.
 
     Args:
         ctx (Context): The agent context object
         user_input (str): The user's input text to process
+        history (str, optional): Compacted earlier conversation for this session. Defaults to "".
+        job_id (str, optional): Request whose progress log receives stage events.
         max_steps (int, optional): Maximum number of iterations. Defaults to 3.
 
     Returns:
@@ -160,10 +171,13 @@ async def begin_react_loop(
             - response: Text response for informational queries
 
     Raises:
+        BuildQueueFull: If the build queue is too long to accept the scaffold job.
         Exception: If an error occurs during action execution or LLM querying.
     """
     step = 0
     result = None
+    progress = get_progress_channel()
+    checkpoints = get_checkpoint_store()
 
     action_descriptions = "\n".join(
         f"- {action.name}: {action.description}" for action in ACTIONS.values()
@@ -171,13 +185,27 @@ async def begin_react_loop(
 
     while step < max_steps:
         try:
-            ctx.logger.info("Querying LLM")
-            response = await call_llm(
-                ctx, PROMPT.format(actions=action_descriptions, input=user_input)
-            )
+            # A retry under the same request id replays the original decision, so it
+            # builds the same project and can resume from its checkpoint
+            decision = await asyncio.to_thread(checkpoints.recall_decision, job_id)
+            if decision:
+                ctx.logger.info("Replaying the decision of an earlier attempt")
+            else:
+                ctx.logger.info("Querying LLM")
+                await asyncio.to_thread(progress.stage, job_id, "thinking")
+                response = await call_llm(
+                    ctx,
+                    PROMPT.format(
+                        actions=action_descriptions, history=history, input=user_input
+                    ),
+                )
 
-            ctx.logger.info("Parsing LLM response")
-            decision = parse_llm_response(response)
+                ctx.logger.info("Parsing LLM response")
+                decision = parse_llm_response(response)
+                if decision.get("action") in ACTIONS:
+                    await asyncio.to_thread(
+                        checkpoints.remember_decision, job_id, decision
+                    )
 
             ctx.logger.info(f"Thought: {decision.get('thought')}")
 
@@ -185,22 +213,47 @@ async def begin_react_loop(
             action_name = decision.get("action")
             if action_name and action_name in ACTIONS:
                 action = ACTIONS[action_name]
+                toolchain = action_name.removeprefix("scaffold_")
+                scheduler = get_build_scheduler()
+                await asyncio.to_thread(progress.stage, job_id, "queued")
                 if action_name == "scaffold_vite":
                     config = ViteConfig(
                         template=decision.get("template"),
                         project_name=decision.get("project_name"),
                         package_manager=decision.get("package_manager"),
                     )
-                    result = action.function(ctx=ctx, vite_config=config)
+                    result = await scheduler.run(
+                        ctx,
+                        toolchain,
+                        config.template,
+                        action.function,
+                        ctx=ctx,
+                        vite_config=config,
+                        job_id=job_id,
+                    )
                 elif action_name == "scaffold_composer":
                     config = ComposerConfig(
                         template=decision.get("template"),
                         project_name=decision.get("project_name"),
                     )
-                    result = action.function(ctx=ctx, composer_config=config)
+                    result = await scheduler.run(
+                        ctx,
+                        toolchain,
+                        config.template,
+                        action.function,
+                        ctx=ctx,
+                        composer_config=config,
+                        job_id=job_id,
+                    )
                 else:
-                    result = action.function(
-                        ctx=ctx, project_name=decision.get("project_name")
+                    result = await scheduler.run(
+                        ctx,
+                        toolchain,
+                        toolchain,
+                        action.function,
+                        ctx=ctx,
+                        project_name=decision.get("project_name"),
+                        job_id=job_id,
                     )
 
                 if result:
@@ -0,0 +1,307 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+from uagents import Context
+
+from src.config import get_config
+from src.dataclasses import ResourceUsage, SandboxLimits
+from src.progress import get_progress_channel
+
+config = get_config()
+
+# Output lines kept for the error raised when a command fails
+OUTPUT_TAIL_LINES = 50
+
+# Output lines buffered before they are published as one batch; the watchdog also
+# flushes the buffer every SANDBOX_CHECK_INTERVAL
+OUTPUT_BATCH_LINES = 50
+
+# Seconds a killed build gets to exit after SIGTERM before it is sent SIGKILL
+KILL_GRACE_PERIOD = 5
+
+# Scratch space inside the workdir for the build's temp files
+SCRATCH_DIR = ".sandbox"
+
+# Variables pointing tools' temp files at the scratch "tmp" directory
+TEMP_VARIABLES = ("TMPDIR", "TMP", "TEMP")
+
+# Package manager download caches, shared by all builds under WORKSPACE_ROOT
+PACKAGE_CACHE_DIR = "cache"
+
+# Variables pointing each tool's download cache at its own package cache subdirectory
+CACHE_VARIABLES = {
+    "XDG_CACHE_HOME": "xdg",
+    "PIP_CACHE_DIR": "pip",
+    "npm_config_cache": "npm",
+    "YARN_CACHE_FOLDER": "yarn",
+    "COMPOSER_CACHE_DIR": "composer",
+}
+
+
+# Output that means a command failed to allocate memory under the memory rlimit,
+# which processes report as an ordinary failure rather than being killed
+OUT_OF_MEMORY_MARKERS = (
+    "cannot allocate memory",
+    "out of memory",
+    "memoryerror",
+    "bad_alloc",
+    "allowed memory size",
+)
+
+
+class SandboxLimitExceeded(Exception):
+    """Raised when a build is killed for going over one of its quotas."""
+
+
+def directory_size(path: str) -> int:
+    """Returns the disk space used by a directory tree, in bytes.
+
+    Uses du, which walks large trees such as node_modules faster than Python and
+    outside this process, and falls back to walking the tree here without it.
+    """
+    try:
+        # du exits non-zero when files vanish mid-walk but still prints the total
+        output = subprocess.run(
+            ["du", "-sk", path], capture_output=True, text=True
+        ).stdout
+        return int(output.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except OSError:
+                pass
+    return total
+
+
+def exit_signal(returncode: int) -> int | None:
+    """Returns the signal that killed a command run through the shell, if any.
+
+    A killed shell has a negative return code; a killed child makes the shell exit
+    with 128 plus the signal number.
+    """
+    if returncode < 0:
+        return -returncode
+    if returncode > 128:
+        return returncode - 128
+    return None
+
+
+def default_limits() -> SandboxLimits:
+    return SandboxLimits(
+        cpu_seconds=config.SANDBOX_CPU_SECONDS,
+        memory_mb=config.SANDBOX_MEMORY_MB,
+        wall_seconds=config.SANDBOX_WALL_SECONDS,
+        disk_mb=config.SANDBOX_DISK_MB,
+    )
+
+
+class Sandbox:
+    """Runs the commands of one build under CPU, memory, wall-time and disk quotas.
+
+    CPU time and memory are enforced per process with shell rlimits, so every
+    child a command spawns inherits them. Wall time and the total size of the
+    build's working directory are watched while commands run, and the whole
+    process group is killed when either goes over. Quotas of 0 are disabled.
+    """
+
+    def __init__(
+        self,
+        ctx: Context,
+        workdir: str,
+        job_id: str | None = None,
+        limits: SandboxLimits | None = None,
+    ):
+        self.ctx = ctx
+        self.workdir = workdir
+        self.job_id = job_id
+        self.limits = limits or default_limits()
+        self.usage = ResourceUsage()
+        self.started_at = time.monotonic()
+        self.progress = get_progress_channel()
+        self.output: list[str] = []
+        self.output_lock = threading.Lock()
+
+    def rlimit_prefix(self) -> str:
+        limits = []
+        if self.limits.cpu_seconds:
+            remaining = self.limits.cpu_seconds - self.usage.cpu_seconds
+            limits.append(f"ulimit -t {max(int(remaining), 1)}; ")
+        if self.limits.memory_mb:
+            limits.append(f"ulimit -d {self.limits.memory_mb * 1024}; ")
+        # dash's ulimit only accepts one limit per call
+        return "".join(limits)
+
+    def watch(self, process: subprocess.Popen, stop: threading.Event) -> None:
+        deadline = (
+            self.started_at + self.limits.wall_seconds
+            if self.limits.wall_seconds
+            else None
+        )
+        disk_checked_at = time.monotonic()
+        while not stop.wait(config.SANDBOX_CHECK_INTERVAL):
+            self.flush_output()
+            reason = None
+            if deadline and time.monotonic() > deadline:
+                reason = f"wall time limit of {self.limits.wall_seconds}s"
+            # Measuring the workdir walks the whole tree, so it runs less often
+            elif (
+                self.limits.disk_mb
+                and time.monotonic() - disk_checked_at
+                >= config.SANDBOX_DISK_CHECK_INTERVAL
+            ):
+                disk_checked_at = time.monotonic()
+                disk_mb = directory_size(self.workdir) / 1024 / 1024
+                self.usage.disk_mb = max(self.usage.disk_mb, disk_mb)
+                if disk_mb > self.limits.disk_mb:
+                    reason = f"disk limit of {self.limits.disk_mb}MB"
+
+            if reason:
+                self.usage.violation = reason
+                self.kill(process, stop)
+                return
+
+    def kill(self, process: subprocess.Popen, stop: threading.Event) -> None:
+        self.ctx.logger.warning(
+            f"Killing build in {self.workdir}: exceeded {self.usage.violation}"
+        )
+        # The command is reaped by run(), which sets stop once it has exited
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            if stop.wait(KILL_GRACE_PERIOD):
+                return
+
+    def flush_output(self) -> None:
+        """Publishes buffered output lines to the job's progress log in one write."""
+        with self.output_lock:
+            lines, self.output = self.output, []
+        self.progress.publish_many(self.job_id, "log", lines)
+
+    def scratch_env(self, env: dict[str, str] | None) -> dict[str, str]:
+        """Points temp files into the workdir and package caches under WORKSPACE_ROOT.
+
+        Temp files count towards the build's disk quota and are deleted with it.
+        Downloaded packages are kept in one cache shared by every build, so repeat
+        builds don't fetch them again; it is trimmed to PACKAGE_CACHE_BUDGET_MB.
+        """
+        tmp_dir = os.path.join(self.workdir, SCRATCH_DIR, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        env = dict(os.environ if env is None else env)
+        env.update({name: tmp_dir for name in TEMP_VARIABLES})
+        for name, subdir in CACHE_VARIABLES.items():
+            cache_dir = os.path.join(config.WORKSPACE_ROOT, PACKAGE_CACHE_DIR, subdir)
+            os.makedirs(cache_dir, exist_ok=True)
+            env[name] = cache_dir
+        return env
+
+    def run(self, command: str, **kwargs) -> None:
+        """Runs a shell command in the sandbox, streaming its output to the job's progress log.
+
+        Args:
+            command (str): The shell command to run.
+            **kwargs: Extra arguments for subprocess.Popen, e.g. cwd and env.
+
+        Raises:
+            SandboxLimitExceeded: If the command was killed for exceeding a quota.
+            subprocess.CalledProcessError: If the command exits with a non-zero status.
+                Its output holds the last lines the command printed.
+        """
+        tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        kwargs["env"] = self.scratch_env(kwargs.get("env"))
+        process = subprocess.Popen(
+            self.rlimit_prefix() + command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            # Own process group, so a kill reaches everything the command spawned
+            start_new_session=True,
+            **kwargs,
+        )
+        stop = threading.Event()
+        watchdog = threading.Thread(
+            target=self.watch, args=(process, stop), daemon=True
+        )
+        watchdog.start()
+
+        try:
+            for line in process.stdout:
+                line = line.rstrip()
+                if line:
+                    tail.append(line)
+                    with self.output_lock:
+                        self.output.append(line)
+                        full = len(self.output) >= OUTPUT_BATCH_LINES
+                    if full:
+                        self.flush_output()
+        finally:
+            process.stdout.close()
+            # wait4 gives the resource usage of this command and the children it reaped
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            stop.set()
+            watchdog.join()
+            self.flush_output()
+
+        self.usage.cpu_seconds += rusage.ru_utime + rusage.ru_stime
+        self.usage.max_rss_mb = max(self.usage.max_rss_mb, rusage.ru_maxrss / 1024)
+
+        if process.returncode and not self.usage.violation:
+            self.usage.violation = self.rlimit_violation(process.returncode, tail)
+            if self.usage.violation:
+                self.ctx.logger.warning(
+                    f"Build in {self.workdir} exceeded {self.usage.violation}"
+                )
+        if self.usage.violation:
+            raise SandboxLimitExceeded(f"Build exceeded its {self.usage.violation}")
+        if process.returncode:
+            self.ctx.logger.error(
+                f"Command failed with exit code {process.returncode}: {command}"
+            )
+            raise subprocess.CalledProcessError(
+                process.returncode, command, output="\n".join(tail)
+            )
+
+    def rlimit_violation(self, returncode: int, tail: deque) -> str | None:
+        """Works out whether a failed command hit one of its rlimits.
+
+        RLIMIT_CPU sends SIGXCPU at the soft limit and SIGKILL at the hard one, and the
+        measured CPU time can read just under the limit because the kernel accounts it
+        in ticks, so the signal is what counts. A command out of memory under
+        RLIMIT_DATA sees its allocations fail and exits with an error instead.
+        """
+        # The watchdog's own kills set the violation first, so SIGKILL here is the rlimit
+        if self.limits.cpu_seconds and exit_signal(returncode) in (
+            signal.SIGXCPU,
+            signal.SIGKILL,
+        ):
+            return f"CPU time limit of {self.limits.cpu_seconds}s"
+        if self.limits.memory_mb and any(
+            marker in line.lower() for line in tail for marker in OUT_OF_MEMORY_MARKERS
+        ):
+            return f"memory limit of {self.limits.memory_mb}MB"
+        return None
+
+    def report(self) -> ResourceUsage:
+        """Logs and publishes the resources the build used, and returns them."""
+        self.usage.wall_seconds = time.monotonic() - self.started_at
+        summary = (
+            f"cpu {self.usage.cpu_seconds:.1f}s, max rss {self.usage.max_rss_mb:.0f}MB, "
+            f"disk {self.usage.disk_mb:.0f}MB, wall {self.usage.wall_seconds:.1f}s"
+        )
+        self.ctx.logger.info(f"Build resource usage: {summary}")
+        self.progress.publish(self.job_id, "log", f"Resource usage: {summary}")
+        return self.usage
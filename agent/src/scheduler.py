@@ -0,0 +1,279 @@
+import asyncio
+import math
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable
+
+from uagents import Context
+
+from src.config import get_config
+from src.dataclasses import BuildJob
+from src.store import SharedStore, get_shared_store
+
+config = get_config()
+
+# Rough build times in seconds, used until a template has timing history
+DEFAULT_COSTS = {"vite": 20.0, "django": 45.0, "composer": 180.0, "rails": 240.0}
+TEMPLATE_COSTS = {"composer:magento": 600.0, "composer:drupal": 300.0}
+
+# Weight of the latest timing in the moving average of build times
+SMOOTHING = 0.3
+
+# Seconds between attempts to take a host-wide toolchain slot held by other workers
+SLOT_POLL_INTERVAL = 1.0
+
+# The job whose function is running, visible from inside its worker thread
+current_job: ContextVar[BuildJob | None] = ContextVar("current_job", default=None)
+
+
+def mark_built() -> None:
+    """Marks the running job as having done a full build, so its duration is timed.
+
+    Jobs answered from a checkpoint finish in a fraction of a real build's time and
+    would drag the template's moving average down.
+    """
+    job = current_job.get()
+    if job is not None:
+        job.built = True
+
+
+class BuildQueueFull(Exception):
+    """Raised when a build would wait longer than BUILD_MAX_QUEUE_WAIT to start."""
+
+    def __init__(self, estimated_wait: float):
+        self.estimated_wait = estimated_wait
+        super().__init__(
+            f"Forge is busy with other builds. Please try again in about {math.ceil(estimated_wait)} seconds."
+        )
+
+
+class BuildScheduler:
+    """Runs scaffold jobs shortest-estimated-first under global and per-toolchain caps.
+
+    A job's priority is its estimated cost minus the time it has waited scaled by the
+    aging rate, so long builds still start eventually under a steady stream of short ones.
+
+    The global cap is per worker. With a shared store the toolchain caps hold across
+    all workers on the host, and capped jobs are registered there so every worker's
+    wait estimate counts the whole host's work for those toolchains.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        toolchain_caps: dict[str, int],
+        aging_rate: float,
+        max_queue_wait: float,
+        store: SharedStore | None = None,
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.toolchain_caps = toolchain_caps
+        self.aging_rate = aging_rate
+        self.max_queue_wait = max_queue_wait
+        self.timings: dict[str, float] = {}
+        self.pending: list[BuildJob] = []
+        self.running: list[BuildJob] = []
+
+    def estimate(self, toolchain: str, template: str) -> float:
+        key = f"{toolchain}:{template}"
+        if key in self.timings:
+            return self.timings[key]
+        return TEMPLATE_COSTS.get(key, DEFAULT_COSTS.get(toolchain, 60.0))
+
+    def record(self, toolchain: str, template: str, elapsed: float) -> None:
+        key = f"{toolchain}:{template}"
+        previous = self.timings.get(key)
+        self.timings[key] = (
+            elapsed
+            if previous is None
+            else SMOOTHING * elapsed + (1 - SMOOTHING) * previous
+        )
+
+    def estimated_wait(self, toolchain: str, cost: float) -> float:
+        """Estimates how long a job of the given cost would queue before starting.
+
+        Globally, only queued jobs that would be scheduled ahead of it (cheaper ones)
+        count, plus the remaining time of the builds already running. A capped
+        toolchain is a queue of its own, so all of that toolchain's queued and running
+        work counts against its cap, and the longer of the two waits wins.
+        """
+        now = time.monotonic()
+
+        def remaining(job: BuildJob) -> float:
+            return max(job.estimated_cost - (now - job.started_at), 0)
+
+        ahead = sum(
+            job.estimated_cost for job in self.pending if job.estimated_cost <= cost
+        )
+        if len(self.running) < self.concurrency and not ahead:
+            global_wait = 0.0
+        else:
+            global_wait = (
+                sum(remaining(job) for job in self.running) + ahead
+            ) / self.concurrency
+
+        queued = [job for job in self.pending if job.toolchain == toolchain]
+        if self.has_capacity(toolchain) and not queued:
+            return global_wait
+        toolchain_wait = (
+            sum(remaining(job) for job in self.running if job.toolchain == toolchain)
+            + sum(job.estimated_cost for job in queued)
+        ) / self.toolchain_caps.get(toolchain, self.concurrency)
+        return max(global_wait, toolchain_wait)
+
+    def host_toolchain_wait(self, toolchain: str) -> float:
+        """Estimates the wait for a capped toolchain's slots across all workers.
+
+        Blocks on the shared store, so call it from a worker thread.
+        """
+        now = time.time()
+        work = sum(
+            cost if started_at is None else max(cost - (now - started_at), 0)
+            for cost, started_at in self.store.jobs(f"toolchain:{toolchain}")
+        )
+        return work / self.toolchain_caps[toolchain]
+
+    def shared(self, toolchain: str) -> bool:
+        return self.store is not None and toolchain in self.toolchain_caps
+
+    def priority(self, job: BuildJob, now: float) -> float:
+        return job.estimated_cost - self.aging_rate * (now - job.submitted_at)
+
+    def has_capacity(self, toolchain: str) -> bool:
+        cap = self.toolchain_caps.get(toolchain, self.concurrency)
+        return sum(job.toolchain == toolchain for job in self.running) < cap
+
+    def dispatch(self) -> None:
+        now = time.monotonic()
+        while len(self.running) < self.concurrency:
+            eligible = [job for job in self.pending if self.has_capacity(job.toolchain)]
+            if not eligible:
+                return
+            job = min(eligible, key=lambda job: self.priority(job, now))
+            self.pending.remove(job)
+            job.started_at = now
+            self.running.append(job)
+            job.ready.set()
+
+    def finish(self, job: BuildJob, future: asyncio.Future) -> None:
+        self.running.remove(job)
+        if job.built and not future.cancelled() and future.exception() is None:
+            self.record(job.toolchain, job.template, time.monotonic() - job.started_at)
+        self.dispatch()
+
+    def run_job(
+        self, job: BuildJob, function: Callable[..., Any], kwargs: dict[str, Any]
+    ) -> Any:
+        """Runs a scheduled job in its worker thread, holding a host-wide toolchain slot.
+
+        Only jobs whose function calls `mark_built` have their duration recorded.
+
+        With several workers the per-toolchain caps apply to the whole host, so a job
+        that has a local slot also waits here for one of the toolchain's shared slots.
+        """
+        # to_thread runs this in a copy of the caller's context, so it's per job
+        current_job.set(job)
+        if not self.shared(job.toolchain):
+            return function(**kwargs)
+
+        key, cap = f"toolchain:{job.toolchain}", self.toolchain_caps[job.toolchain]
+        try:
+            while not self.store.acquire_slot(key, cap, job.id):
+                time.sleep(SLOT_POLL_INTERVAL)
+            self.store.start_job(key, job.id)
+            # Time spent waiting on other workers isn't part of the build's duration
+            job.started_at = time.monotonic()
+            try:
+                return function(**kwargs)
+            finally:
+                self.store.release_slot(key, job.id)
+        finally:
+            self.store.remove_job(key, job.id)
+
+    async def run(
+        self,
+        ctx: Context,
+        toolchain: str,
+        template: str,
+        function: Callable[..., Any],
+        /,
+        **kwargs: Any,
+    ) -> Any:
+        """Queues a blocking scaffold function and runs it in a worker thread when scheduled.
+
+        Args:
+            ctx (Context): The agent context object.
+            toolchain (str): Toolchain the job uses, e.g. "composer".
+            template (str): Template being scaffolded, used to look up timing history.
+            function (Callable[..., Any]): The scaffold function to run.
+            **kwargs (Any): Keyword arguments for the scaffold function.
+
+        Returns:
+            Any: The scaffold function's return value.
+
+        Raises:
+            BuildQueueFull: If the estimated queue wait exceeds BUILD_MAX_QUEUE_WAIT.
+        """
+        cost = self.estimate(toolchain, template)
+        wait = self.estimated_wait(toolchain, cost)
+        if self.shared(toolchain):
+            wait = max(
+                wait, await asyncio.to_thread(self.host_toolchain_wait, toolchain)
+            )
+        if wait > self.max_queue_wait:
+            ctx.logger.warning(
+                f"Shedding {toolchain}:{template} build, estimated queue wait {wait:.0f}s"
+            )
+            raise BuildQueueFull(wait)
+
+        job = BuildJob(
+            toolchain=toolchain,
+            template=template,
+            estimated_cost=cost,
+            submitted_at=time.monotonic(),
+        )
+        if self.shared(toolchain):
+            await asyncio.to_thread(
+                self.store.add_job, f"toolchain:{toolchain}", job.id, cost
+            )
+        self.pending.append(job)
+        self.dispatch()
+
+        try:
+            await job.ready.wait()
+        except asyncio.CancelledError:
+            if job in self.pending:
+                self.pending.remove(job)
+            elif job in self.running:
+                self.running.remove(job)
+                self.dispatch()
+            if self.shared(toolchain):
+                # The job never reached run_job, which would otherwise unregister it
+                asyncio.get_running_loop().run_in_executor(
+                    None, self.store.remove_job, f"toolchain:{toolchain}", job.id
+                )
+            raise
+
+        ctx.logger.info(
+            f"Starting {toolchain}:{template} build after {job.started_at - job.submitted_at:.1f}s in queue "
+            f"(estimated {cost:.0f}s, {len(self.pending)} queued, {len(self.running)} running)"
+        )
+        # Free the slot when the thread actually finishes, even if the request is cancelled
+        future = asyncio.ensure_future(
+            asyncio.to_thread(self.run_job, job, function, kwargs)
+        )
+        future.add_done_callback(lambda future: self.finish(job, future))
+        return await asyncio.shield(future)
+
+
+@lru_cache
+def get_build_scheduler() -> BuildScheduler:
+    return BuildScheduler(
+        concurrency=config.BUILD_CONCURRENCY,
+        toolchain_caps=config.BUILD_TOOLCHAIN_CAPS,
+        aging_rate=config.BUILD_AGING_RATE,
+        max_queue_wait=config.BUILD_MAX_QUEUE_WAIT,
+        store=get_shared_store(),
+    )
@@ -19,9 +19,45 @@ class Data(Model):
 
 class Request(Model):
     query: str
+    session_id: Optional[str] = None
+    request_id: Optional[str] = None
 
 
 class Response(Model):
     status: str
     message: str
     data: Optional[Data] = None
+
+
+class ProgressRequest(Model):
+    request_id: str
+    cursor: int = 0
+
+
+class ProgressEvent(Model):
+    seq: int
+    kind: str
+    message: str
+
+
+class ProgressResponse(Model):
+    events: list[ProgressEvent]
+    cursor: int
+    done: bool
+
+
+class WorkerHealth(Model):
+    worker_id: int
+    pid: int
+    port: int
+    uptime: float
+    rss_mb: float
+    requests: int
+    running_builds: int
+    queued_builds: int
+    workspace_used_mb: float
+    workspace_free_mb: float
+
+
+class HealthResponse(Model):
+    workers: list[WorkerHealth]
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from functools import lru_cache
+from typing import Any
+
+from src.config import get_config
+from src.dataclasses import Session, Turn
+from src.store import SharedStore, get_shared_store
+
+config = get_config()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+def truncate(text: str | None, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else f"{text[: limit - 3]}..."
+
+
+def summarise_turn(turn: Turn) -> str:
+    """Compacts a turn into a single line for the conversation summary.
+
+    Args:
+        turn (Turn): The turn to compact.
+
+    Returns:
+        str: One-line summary of the request and the decision taken.
+    """
+    request = truncate(turn.user_input, 80)
+    if turn.action:
+        args = json.dumps(turn.action_args or {}, separators=(",", ":"))
+        return f"User asked: {request} -> ran {turn.action} with {args}"
+    return f"User asked: {request} -> answered: {truncate(turn.response, 120)}"
+
+
+def render_turn(turn: Turn) -> list[str]:
+    lines = [f"User: {truncate(turn.user_input, 400)}"]
+    if turn.action:
+        lines.append(
+            f"Assistant: Action: {turn.action} Action Args: {json.dumps(turn.action_args or {})}"
+        )
+    else:
+        lines.append(f"Assistant: {truncate(turn.response, 400)}")
+    return lines
+
+
+class SessionStore:
+    """Per-sender conversation memory with LRU eviction and idle expiry.
+
+    Only the most recent turns are kept verbatim; older ones are folded into a
+    summary so the rendered context stays within a fixed token budget.
+    """
+
+    def __init__(
+        self, max_sessions: int, ttl: int, recent_turns: int, token_budget: int
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+        # Sessions are read and saved from worker threads, off the event loop
+        self.lock = threading.Lock()
+
+    def get(self, session_id: str) -> Session | None:
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.updated_at > self.ttl:
+                del self.sessions[session_id]
+                return None
+            self.sessions.move_to_end(session_id)
+            return session
+
+    def record(self, session_id: str, user_input: str, data: dict[str, Any]) -> None:
+        """Appends a completed turn to a session, compacting older turns.
+
+        Args:
+            session_id (str): Identifier of the conversation.
+            user_input (str): The user's query for this turn.
+            data (dict[str, Any]): The ReAct loop result for this turn.
+        """
+        session = self.get(session_id) or Session(updated_at=time.monotonic())
+        session.turns.append(
+            Turn(
+                user_input=user_input,
+                action=data.get("action"),
+                action_args=data.get("action_args"),
+                result=data.get("result"),
+                response=data.get("response"),
+            )
+        )
+        while len(session.turns) > self.recent_turns:
+            session.summary.append(summarise_turn(session.turns.pop(0)))
+        # Keep the older summary list from growing past what can ever be rendered
+        summary, _ = self.fit(session)
+        del session.summary[: len(session.summary) - len(summary)]
+        session.updated_at = time.monotonic()
+        self.save(session_id, session)
+
+    def save(self, session_id: str, session: Session) -> None:
+        with self.lock:
+            self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+    def fit(self, session: Session) -> tuple[list[str], list[str]]:
+        """Returns the summary and recent-turn lines that fit the token budget, oldest dropped first."""
+        summary = [f"- {line}" for line in session.summary]
+        recent = [line for turn in session.turns for line in render_turn(turn)]
+
+        used = sum(estimate_tokens(line) for line in summary + recent)
+        while summary and used > self.token_budget:
+            used -= estimate_tokens(summary.pop(0))
+        while recent and used > self.token_budget:
+            used -= estimate_tokens(recent.pop(0))
+        return summary, recent
+
+    def render(self, session_id: str) -> str:
+        """Renders a session as prompt context, dropping the oldest lines to fit the budget.
+
+        Args:
+            session_id (str): Identifier of the conversation.
+
+        Returns:
+            str: Conversation context to place before the current user input.
+        """
+        session = self.get(session_id)
+        if session is None:
+            return ""
+
+        summary, recent = self.fit(session)
+        lines = []
+        if summary:
+            lines.append("Summary of earlier conversation:")
+            lines.extend(summary)
+        lines.extend(recent)
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class SharedSessionStore(SessionStore):
+    """Session store kept in the shared store, so follow-ups can land on any worker."""
+
+    def __init__(self, store: SharedStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def get(self, session_id: str) -> Session | None:
+        data = self.store.get(f"session:{session_id}")
+        if data is None:
+            return None
+        return Session(
+            updated_at=data["updated_at"],
+            turns=[Turn(**turn) for turn in data["turns"]],
+            summary=data["summary"],
+        )
+
+    def save(self, session_id: str, session: Session) -> None:
+        self.store.set(f"session:{session_id}", asdict(session), ttl=self.ttl)
+        self.store.trim("session:", self.max_sessions)
+
+
+@lru_cache
+def get_session_store() -> SessionStore:
+    options = {
+        "max_sessions": config.SESSION_MAX_COUNT,
+        "ttl": config.SESSION_TTL,
+        "recent_turns": config.SESSION_RECENT_TURNS,
+        "token_budget": config.SESSION_TOKEN_BUDGET,
+    }
+    store = get_shared_store()
+    if store:
+        return SharedSessionStore(store, **options)
+    return SessionStore(**options)
@@ -0,0 +1,280 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any
+
+from src.config import get_config
+
+config = get_config()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    PRIMARY KEY (key, owner)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    started_at REAL,
+    PRIMARY KEY (key, owner)
+);
+CREATE TABLE IF NOT EXISTS streams (
+    stream TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (stream, seq)
+);
+"""
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedStore:
+    """SQLite-backed state shared by the agent worker processes on one host.
+
+    Holds rate-limit counters, build slots, progress streams, caches and worker heartbeats so
+    any worker can answer for state another worker produced. Each thread gets its
+    own connection; WAL mode lets readers proceed while one worker writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, key: str) -> Any | None:
+        row = (
+            self.connection()
+            .execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def get_prefix(self, prefix: str) -> dict[str, Any]:
+        rows = self.connection().execute(
+            "SELECT key, value FROM kv WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time()),
+        )
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        now = time.time()
+        self.connection().execute(
+            "INSERT OR REPLACE INTO kv (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now + ttl if ttl else None),
+        )
+
+    def trim(self, prefix: str, keep: int) -> None:
+        """Deletes all but the `keep` most recently updated keys under a prefix."""
+        self.connection().execute(
+            """DELETE FROM kv WHERE key >= ? AND key < ? AND key NOT IN (
+                SELECT key FROM kv WHERE key >= ? AND key < ?
+                ORDER BY updated_at DESC LIMIT ?
+            )""",
+            (prefix, prefix + "\uffff", prefix, prefix + "\uffff", keep),
+        )
+
+    def claim(self, key: str, ttl: float) -> bool:
+        """Takes a lease on a key for `ttl` seconds; False if another process holds it.
+
+        Used so periodic work such as toolchain refreshes runs once per host, not once
+        per worker.
+        """
+        now = time.time()
+        owner = os.getpid()
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] > now and json.loads(row[0]) != owner:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(owner), now, now + ttl),
+            )
+            return True
+
+    @staticmethod
+    def reap(conn: sqlite3.Connection, table: str, key: str) -> None:
+        """Deletes a key's rows owned by processes that have since died."""
+        pids = {
+            pid
+            for (pid,) in conn.execute(
+                f"SELECT DISTINCT pid FROM {table} WHERE key = ?", (key,)
+            )
+        }
+        for pid in pids - {os.getpid()}:
+            if not pid_alive(pid):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE key = ? AND pid = ?", (key, pid)
+                )
+
+    def acquire_slot(self, key: str, limit: int, owner: str) -> bool:
+        """Takes one of `limit` counted slots under a key; False if all are taken.
+
+        Slots held by processes that have since died are reclaimed first, so a
+        crashed worker can't keep a toolchain's slots forever.
+        """
+        with self.transaction() as conn:
+            self.reap(conn, "slots", key)
+            [(taken,)] = conn.execute(
+                "SELECT COUNT(*) FROM slots WHERE key = ?", (key,)
+            ).fetchall()
+            if taken >= limit:
+                return False
+            conn.execute(
+                "INSERT INTO slots (key, owner, pid) VALUES (?, ?, ?)",
+                (key, owner, os.getpid()),
+            )
+            return True
+
+    def release_slot(self, key: str, owner: str) -> None:
+        self.connection().execute(
+            "DELETE FROM slots WHERE key = ? AND owner = ?", (key, owner)
+        )
+
+    def add_job(self, key: str, owner: str, cost: float) -> None:
+        """Registers a queued job and its estimated cost, so every worker can see it."""
+        self.connection().execute(
+            "INSERT OR REPLACE INTO jobs (key, owner, pid, cost) VALUES (?, ?, ?, ?)",
+            (key, owner, os.getpid(), cost),
+        )
+
+    def start_job(self, key: str, owner: str) -> None:
+        self.connection().execute(
+            "UPDATE jobs SET started_at = ? WHERE key = ? AND owner = ?",
+            (time.time(), key, owner),
+        )
+
+    def remove_job(self, key: str, owner: str) -> None:
+        self.connection().execute(
+            "DELETE FROM jobs WHERE key = ? AND owner = ?", (key, owner)
+        )
+
+    def jobs(self, key: str) -> list[tuple[float, float | None]]:
+        """Returns the estimated cost and start time (None while queued) of a key's jobs."""
+        with self.transaction() as conn:
+            self.reap(conn, "jobs", key)
+            return conn.execute(
+                "SELECT cost, started_at FROM jobs WHERE key = ?", (key,)
+            ).fetchall()
+
+    def hit(self, key: str, period: float) -> int:
+        """Counts a hit in the current fixed window of `period` seconds and returns the total."""
+        now = time.time()
+        window = f"{key}:{int(now // period)}"
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+            [(count,)] = conn.execute(
+                """INSERT INTO counters (key, count, expires_at) VALUES (?, 1, ?)
+                ON CONFLICT(key) DO UPDATE SET count = count + 1
+                RETURNING count""",
+                (window, (now // period + 1) * period),
+            ).fetchall()
+            return count
+
+    def append(self, stream: str, item: Any, maxlen: int) -> int:
+        """Appends an item to a stream, dropping the oldest beyond `maxlen`, and returns its seq."""
+        return self.append_many(stream, [item], maxlen)
+
+    def append_many(self, stream: str, items: list[Any], maxlen: int) -> int:
+        """Appends items to a stream in one transaction and returns the last seq."""
+        now = time.time()
+        with self.transaction() as conn:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM streams WHERE stream = ?",
+                (stream,),
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO streams (stream, seq, item, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (stream, seq + i, json.dumps(item), now)
+                    for i, item in enumerate(items, 1)
+                ],
+            )
+            seq += len(items)
+            conn.execute(
+                "DELETE FROM streams WHERE stream = ? AND seq <= ?",
+                (stream, seq - maxlen),
+            )
+            return seq
+
+    def read(self, stream: str, cursor: int) -> list[tuple[int, Any]]:
+        rows = self.connection().execute(
+            "SELECT seq, item FROM streams WHERE stream = ? AND seq > ? ORDER BY seq",
+            (stream, cursor),
+        )
+        return [(seq, json.loads(item)) for seq, item in rows]
+
+    def purge(self, stream_ttl: float) -> None:
+        """Deletes expired keys and streams with no activity for `stream_ttl` seconds."""
+        now = time.time()
+        conn = self.connection()
+        conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        conn.execute(
+            """DELETE FROM streams WHERE stream IN (
+                SELECT stream FROM streams GROUP BY stream HAVING MAX(created_at) < ?
+            )""",
+            (now - stream_ttl,),
+        )
+
+
+@lru_cache
+def get_shared_store() -> SharedStore | None:
+    """Returns the host-wide store when SHARED_STORE_PATH is set, else None."""
+    if not config.SHARED_STORE_PATH:
+        return None
+    return SharedStore(config.SHARED_STORE_PATH)
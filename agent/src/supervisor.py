@@ -0,0 +1,204 @@
+"""Runs several agent worker processes behind one port.
+
+Each worker is a full ``src.forge`` process with its own event loop and build
+sandboxes, listening on a private port. The supervisor spreads incoming
+connections over the live workers, restarts any that die and points them all
+at one shared store so sessions, rate limits and progress are host-wide.
+
+Usage:
+    python -m src.supervisor
+    WORKERS=8 python -m src.supervisor
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+from itertools import count
+
+from src.config import get_config
+from src.store import get_shared_store
+from src.utils import serve_artifacts
+
+config = get_config()
+
+logger = logging.getLogger("supervisor")
+
+DEFAULT_STORE_PATH = "/tmp/forge-shared.db"
+
+# Same default port a single agent process listens on
+DEFAULT_PORT = 8000
+
+# Wait this long before restarting a worker that keeps dying on startup
+RESTART_BACKOFF = 5
+
+CONNECT_TIMEOUT = 2
+
+
+class Worker:
+    """One agent worker process and the private port it listens on."""
+
+    def __init__(self, worker_id: int, port: int, store_path: str):
+        self.worker_id = worker_id
+        self.port = port
+        self.store_path = store_path
+        self.process: subprocess.Popen | None = None
+
+    def start(self) -> None:
+        env = {
+            **os.environ,
+            "PORT": str(self.port),
+            "WORKER_ID": str(self.worker_id),
+            "SHARED_STORE_PATH": self.store_path,
+            # The supervisor serves local artifacts once for the whole host
+            "LOCAL_STORAGE_SERVE": "false",
+        }
+        self.process = subprocess.Popen([sys.executable, "-m", "src.forge"], env=env)
+        logger.info(
+            f"Started worker {self.worker_id} (pid {self.process.pid}) on port {self.port}"
+        )
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self) -> None:
+        if self.alive():
+            self.process.terminate()
+
+
+class Supervisor:
+    """Starts the workers, proxies connections to them and keeps them running."""
+
+    def __init__(self, workers: int, port: int, store_path: str):
+        self.port = port
+        # Workers take the ports after PORT, skipping the one artifacts are served on
+        ports = (p for p in count(port + 1) if p != config.LOCAL_STORAGE_PORT)
+        self.workers = [Worker(i, next(ports), store_path) for i in range(workers)]
+        self.turn = count()
+
+    async def pipe(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def connect(
+        self,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter] | None:
+        """Opens a connection to the next reachable worker, round-robin."""
+        for _ in range(len(self.workers)):
+            worker = self.workers[next(self.turn) % len(self.workers)]
+            if not worker.alive():
+                continue
+            try:
+                return await asyncio.wait_for(
+                    asyncio.open_connection("127.0.0.1", worker.port), CONNECT_TIMEOUT
+                )
+            except (OSError, asyncio.TimeoutError):
+                continue
+        return None
+
+    async def handle_client(
+        self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter
+    ) -> None:
+        upstream = await self.connect()
+        if upstream is None:
+            logger.warning("No worker available, dropping connection")
+            client_writer.close()
+            return
+
+        upstream_reader, upstream_writer = upstream
+        try:
+            await asyncio.gather(
+                self.pipe(client_reader, upstream_writer),
+                self.pipe(upstream_reader, client_writer),
+            )
+        except asyncio.CancelledError:
+            # Shutting down while the connection is still open
+            client_writer.close()
+            upstream_writer.close()
+
+    async def watch(self) -> None:
+        """Restarts dead workers and logs the host's health every HEALTH_INTERVAL."""
+        store = get_shared_store()
+        while True:
+            await asyncio.sleep(config.HEALTH_INTERVAL)
+            for worker in self.workers:
+                if not worker.alive():
+                    logger.warning(
+                        f"Worker {worker.worker_id} exited with code {worker.process.returncode}, restarting"
+                    )
+                    await asyncio.sleep(RESTART_BACKOFF)
+                    worker.start()
+
+            heartbeats = store.get_prefix("health:")
+            summary = ", ".join(
+                f"#{h['worker_id']}: {h['requests']} req, {h['running_builds']} running, "
+                f"{h['queued_builds']} queued, {h['rss_mb']:.0f}MB"
+                for h in sorted(heartbeats.values(), key=lambda h: h["worker_id"])
+            )
+            logger.info(
+                f"{len(heartbeats)}/{len(self.workers)} workers healthy ({summary})"
+            )
+
+    async def run(self) -> None:
+        if config.STORAGE_BACKEND == "local":
+            serve_artifacts(config.LOCAL_STORAGE_DIR, config.LOCAL_STORAGE_PORT)
+            logger.info(f"Serving local artifacts on port {config.LOCAL_STORAGE_PORT}")
+
+        for worker in self.workers:
+            worker.start()
+
+        loop = asyncio.get_running_loop()
+        stopping = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stopping.set)
+
+        server = await asyncio.start_server(self.handle_client, "0.0.0.0", self.port)
+        logger.info(
+            f"Proxying port {self.port} to {len(self.workers)} workers on ports "
+            f"{', '.join(str(worker.port) for worker in self.workers)}"
+        )
+
+        watcher = asyncio.create_task(self.watch())
+        try:
+            await stopping.wait()
+        finally:
+            logger.info("Shutting down workers")
+            watcher.cancel()
+            server.close()
+            for worker in self.workers:
+                worker.stop()
+            for worker in self.workers:
+                if worker.process:
+                    worker.process.wait()
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO, format="%(levelname)s:%(name)s: %(message)s"
+    )
+
+    store_path = config.SHARED_STORE_PATH or DEFAULT_STORE_PATH
+    # Workers read the path from the environment, and so does this process's store
+    os.environ["SHARED_STORE_PATH"] = store_path
+    config.SHARED_STORE_PATH = store_path
+
+    supervisor = Supervisor(
+        workers=config.WORKERS or os.cpu_count() or 1,
+        port=int(config.PORT or DEFAULT_PORT),
+        store_path=store_path,
+    )
+    asyncio.run(supervisor.run())
+
+
+if __name__ == "__main__":
+    main()
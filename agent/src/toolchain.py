@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable
+
+from uagents import Context
+
+from src.config import get_config
+from src.store import SharedStore, get_shared_store
+
+config = get_config()
+
+# Composer package and extra options behind each PHP template
+COMPOSER_PACKAGES = {
+    "laravel": ("laravel/laravel", "--prefer-dist"),
+    "symfony": ("symfony/skeleton", ""),
+    "drupal": ("drupal/recommended-project", ""),
+    "wordpress": ("roots/bedrock", ""),
+    "cakephp": ("cakephp/app", "--prefer-dist"),
+    "phpbb": ("phpbb/phpbb", ""),
+    "magento": (
+        "magento/project-community-edition",
+        "--repository-url=https://repo.magento.com/",
+    ),
+    "joomla": ("joomla/joomla-cms", ""),
+    "octobercms": ("october/october", ""),
+    "silverstripe": ("silverstripe/installer", ""),
+}
+
+
+def fetch_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=config.TOOLCHAIN_RESOLVE_TIMEOUT) as r:
+        return json.load(r)
+
+
+def resolve_npm(package: str) -> str:
+    return fetch_json(f"https://registry.npmjs.org/{package}/latest")["version"]
+
+
+def resolve_pypi(package: str) -> str:
+    # Resolve with pip in a venv of the interpreter builds use, so releases that
+    # need a newer Python than the runtime has are skipped
+    with tempfile.TemporaryDirectory() as temp_dir:
+        venv_path = os.path.join(temp_dir, "venv")
+        subprocess.run(
+            ["python3", "-m", "venv", venv_path],
+            capture_output=True,
+            check=True,
+            timeout=config.TOOLCHAIN_RESOLVE_TIMEOUT,
+        )
+        output = subprocess.run(
+            [
+                os.path.join(venv_path, "bin", "python"),
+                "-m",
+                "pip",
+                "install",
+                "--dry-run",
+                "--ignore-installed",
+                "--quiet",
+                "--report",
+                "-",
+                package,
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+            timeout=config.TOOLCHAIN_RESOLVE_TIMEOUT,
+        ).stdout
+
+    for item in json.loads(output)["install"]:
+        if item["metadata"]["name"].lower() == package.lower():
+            return item["metadata"]["version"]
+    raise LookupError(f"pip did not resolve {package}")
+
+
+def resolve_packagist(package: str) -> str:
+    # create-project picks the newest release whose platform requirements (PHP
+    # version and extensions) the local PHP satisfies; --no-install stops it
+    # after fetching the skeleton
+    with tempfile.TemporaryDirectory() as temp_dir:
+        result = subprocess.run(
+            [
+                "composer",
+                "create-project",
+                "--no-install",
+                "--no-scripts",
+                "--no-plugins",
+                "--no-interaction",
+                package,
+                os.path.join(temp_dir, "project"),
+            ],
+            capture_output=True,
+            check=True,
+            env={**os.environ, "HOME": config.HOME_PATH},
+            text=True,
+            timeout=config.TOOLCHAIN_RESOLVE_TIMEOUT,
+        )
+
+    match = re.search(
+        rf"Installing {re.escape(package)} \(([^)]+)\)", result.stdout + result.stderr
+    )
+    if not match:
+        raise LookupError(f"Composer did not resolve {package}")
+    return match.group(1)
+
+
+def resolve_rails() -> str:
+    # `rails _x.y.z_ new` only works with an installed gem, so pin to the local one
+    env = os.environ.copy()
+    env.update(
+        {
+            "GEM_HOME": config.GEM_HOME,
+            "GEM_PATH": config.GEM_PATH,
+            "PATH": f"{env['PATH']}:{config.RUBY_PATH}",
+        }
+    )
+    output = subprocess.run(
+        ["rails", "--version"],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+        timeout=config.TOOLCHAIN_RESOLVE_TIMEOUT,
+    ).stdout
+    return output.split()[-1]
+
+
+def resolvers() -> dict[str, Callable[[], str]]:
+    tools = {
+        "create-vite": lambda: resolve_npm("create-vite"),
+        "django": lambda: resolve_pypi("Django"),
+        "rails": resolve_rails,
+    }
+    for template, (package, _) in COMPOSER_PACKAGES.items():
+        # Magento's repository needs credentials to list releases
+        if template != "magento":
+            tools[package] = lambda package=package: resolve_packagist(package)
+    return tools
+
+
+class ToolchainRegistry:
+    """Cache of resolved scaffolder versions, refreshed on a schedule instead of per request."""
+
+    def __init__(self, store: SharedStore | None = None):
+        self.store = store
+        self._versions: dict[str, str] = {}
+        self.resolved_at: float | None = None
+
+    @property
+    def versions(self) -> dict[str, str]:
+        # With several workers, whichever one refreshed last published the pins
+        if self.store:
+            return self.store.get("toolchain:versions") or {}
+        return self._versions
+
+    @versions.setter
+    def versions(self, versions: dict[str, str]) -> None:
+        if self.store:
+            self.store.set("toolchain:versions", versions)
+        self._versions = versions
+
+    def get(self, tool: str) -> str | None:
+        """Returns the pinned version of a tool, or None if it hasn't been resolved yet."""
+        return self.versions.get(tool)
+
+    def refresh(self, ctx: Context) -> dict[str, str]:
+        """Resolves the newest installable version of every tool, keeping the previous pin on failure.
+
+        Args:
+            ctx (Context): The agent context object.
+
+        Returns:
+            dict[str, str]: The pinned versions after the refresh.
+        """
+        started = time.perf_counter()
+        tools = resolvers()
+
+        with ThreadPoolExecutor(max_workers=len(tools)) as executor:
+            futures = {
+                tool: executor.submit(resolve) for tool, resolve in tools.items()
+            }
+
+        versions = dict(self.versions)
+        for tool, future in futures.items():
+            try:
+                versions[tool] = future.result()
+            except Exception as e:
+                ctx.logger.warning(f"Could not resolve {tool} version: {e}")
+
+        # Swap the whole mapping so readers never see a half-updated cache
+        self.versions = versions
+        self.resolved_at = time.time()
+        ctx.logger.info(
+            f"Resolved {len(versions)} toolchain version(s) in {time.perf_counter() - started:.2f}s"
+        )
+        return versions
+
+
+@lru_cache
+def get_toolchain_registry() -> ToolchainRegistry:
+    return ToolchainRegistry(get_shared_store())
@@ -1,23 +1,139 @@
 import os
 import shutil
 import subprocess
-import tempfile
+from dataclasses import asdict
+from typing import Any, Callable
 
 from uagents import Context
 
+from src.checkpoints import get_checkpoint_store
 from src.config import get_config
 from src.dataclasses import ComposerConfig, ViteConfig
-from src.utils import create_zip_file, move_zip_file, upload_to_s3
+from src.toolchain import COMPOSER_PACKAGES, get_toolchain_registry
+from src.progress import get_progress_channel
+from src.sandbox import Sandbox
+from src.scheduler import mark_built
+from src.utils import create_zip_file, move_zip_file, upload_artifact
 
 config = get_config()
+toolchain = get_toolchain_registry()
+progress = get_progress_channel()
+checkpoints = get_checkpoint_store()
 
 
-def scaffold_django(ctx: Context, project_name: str = "myproject") -> str:
+def toolchain_metadata(tool: str, version: str | None) -> dict[str, str]:
+    """Describes the scaffolder that produced an artifact, for the artifact's metadata."""
+    return {"tool": tool, "tool-version": version or "unpinned"}
+
+
+def run_pinned(
+    ctx: Context,
+    sandbox: Sandbox,
+    pinned: str | None,
+    unpinned: str,
+    metadata: dict[str, str],
+    leftover: str | None = None,
+    **kwargs,
+) -> None:
+    """Runs a pinned install command, falling back to the unpinned one if it fails.
+
+    A pin the runtime can't install (e.g. a release needing a newer PHP) shouldn't
+    fail a build that the unpinned command would complete.
+
+    Args:
+        ctx (Context): The agent context object.
+        sandbox (Sandbox): The build's sandbox.
+        pinned (str | None): Command installing the pinned version, if there is a pin.
+        unpinned (str): Command letting the tool pick the version itself.
+        metadata (dict[str, str]): The artifact's metadata, updated on fallback.
+        leftover (str, optional): Path the failed attempt may have left behind.
+        **kwargs: Extra arguments for Sandbox.run, e.g. cwd and env.
+    """
+    if pinned:
+        try:
+            sandbox.run(pinned, **kwargs)
+            return
+        except subprocess.CalledProcessError:
+            ctx.logger.warning(f"Pinned install failed, retrying unpinned: {unpinned}")
+            progress.publish(sandbox.job_id, "log", "Retrying without version pin")
+            metadata["tool-version"] = "unpinned"
+            if leftover:
+                shutil.rmtree(leftover, ignore_errors=True)
+    sandbox.run(unpinned, **kwargs)
+
+
+def build_project(
+    ctx: Context,
+    job_id: str | None,
+    project_name: str,
+    params: dict[str, Any],
+    metadata: dict[str, str],
+    generate: Callable[[Sandbox, str], None],
+) -> str:
+    """Runs a scaffold's generate, archive and upload stages, resuming from a checkpoint.
+
+    Each completed stage is checkpointed under the request id, so retrying a request
+    whose upload failed re-uploads the existing archive instead of rebuilding it.
+
+    Args:
+        ctx (Context): The agent context object.
+        job_id (str | None): Request id, used as the idempotency key and progress log.
+        project_name (str): Name of the project directory generate creates.
+        params (dict[str, Any]): Build settings; a retry with different ones rebuilds.
+        metadata (dict[str, str]): Details stored alongside the published archive.
+        generate (Callable[[Sandbox, str], None]): Creates the project in the given
+            working directory, running its commands through the sandbox.
+
+    Returns:
+        str: Public URL of the uploaded project archive.
+    """
+    # A duplicate of an in-flight request waits here instead of clobbering its build
+    with checkpoints.lock(ctx, job_id):
+        checkpoint = checkpoints.open(
+            ctx, job_id, {"project_name": project_name, **params, **metadata}
+        )
+        workdir = checkpoints.workdir(checkpoint.directory)
+        sandbox = None
+        try:
+            if not checkpoints.done(checkpoint, "generate"):
+                sandbox = Sandbox(ctx, workdir, job_id)
+                generate(sandbox, workdir)
+                checkpoints.complete(checkpoint, "generate")
+                mark_built()
+
+            if not checkpoints.done(checkpoint, "archive"):
+                progress.stage(job_id, "packaging")
+                zip_path = create_zip_file(ctx, workdir, project_name)
+                final_zip_path = move_zip_file(
+                    ctx, zip_path, checkpoint.directory, project_name
+                )
+                checkpoints.complete(checkpoint, "archive", archive=final_zip_path)
+                ctx.logger.info(f"Project zipped successfully: {final_zip_path}")
+
+            if not checkpoints.done(checkpoint, "upload"):
+                progress.stage(job_id, "uploading")
+                artifact_url = upload_artifact(
+                    ctx, checkpoint.archive, project_name, metadata
+                )
+                checkpoints.complete(checkpoint, "upload", url=artifact_url)
+                ctx.logger.info(f"Project uploaded successfully: {artifact_url}")
+
+            return checkpoint.url
+        finally:
+            if sandbox:
+                sandbox.report()
+            checkpoints.release(ctx, checkpoint, retryable=bool(job_id))
+
+
+def scaffold_django(
+    ctx: Context, project_name: str = "myproject", job_id: str | None = None
+) -> str:
     """Scaffolds a Django project and returns the path to the zipped project.
 
     Args:
         ctx (Context): The agent context object.
         project_name (str, optional): Name of the Django project. Defaults to "myproject".
+        job_id (str, optional): Request whose progress log receives build events.
 
     Returns:
         str: Path to the zipped project.
@@ -27,18 +143,17 @@ def scaffold_django(ctx: Context, project_name: str = "myproject") -> str:
         subprocess.CalledProcessError: If the command to create the Django project fails.
         Exception: If any error occurs during the project creation or zipping process.
     """
-    try:
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
+    project_name = project_name.replace(" ", "-")
+    django_version = toolchain.get("django")
+    metadata = toolchain_metadata("django", django_version)
 
-        project_name = project_name.replace(" ", "-")
+    def generate(sandbox: Sandbox, temp_dir: str) -> None:
+        progress.stage(job_id, "installing")
 
         # Create virtual environment
         venv_path = os.path.join(temp_dir, "venv")
-        subprocess.run(
+        sandbox.run(
             f"python3 -m venv {venv_path}",
-            shell=True,
-            check=True,
             env={"PATH": f"{os.environ['PATH']}:/usr/bin"},
         )
 
@@ -46,37 +161,39 @@ def scaffold_django(ctx: Context, project_name: str = "myproject") -> str:
         pip_path = os.path.join(venv_path, "bin", "pip")
         python_path = os.path.join(venv_path, "bin", "python")
 
-        # Install Django
-        subprocess.run(
-            f"{pip_path} install django", shell=True, check=True, cwd=temp_dir
+        # Install Django, pinned to the cached version when one has been resolved
+        run_pinned(
+            ctx,
+            sandbox,
+            f"{pip_path} install django=={django_version}" if django_version else None,
+            f"{pip_path} install django",
+            metadata,
+            cwd=temp_dir,
         )
         ctx.logger.info("Django installed successfully.")
 
         # Create Django project
-        subprocess.run(
+        sandbox.run(
             f"{python_path} -m django startproject {project_name}",
-            shell=True,
-            check=True,
             cwd=temp_dir,
         )
 
         # Create requirements.txt
-        subprocess.run(
+        sandbox.run(
             f"{pip_path} freeze > requirements.txt",
-            shell=True,
-            check=True,
             cwd=temp_dir,
         )
         ctx.logger.info("requirements.txt created successfully.")
 
-        # Create zip file
-        zip_path = create_zip_file(ctx, temp_dir, project_name)
-        directory = "/tmp"
-        final_zip_path = move_zip_file(ctx, zip_path, directory, project_name)
-        ctx.logger.info(f"Project zipped successfully: {final_zip_path}")
-
-        s3_url = upload_to_s3(ctx, final_zip_path, project_name)
-        ctx.logger.info(f"Project uploaded successfully: {s3_url}")
+    try:
+        return build_project(
+            ctx,
+            job_id,
+            project_name,
+            {},
+            metadata,
+            generate,
+        )
     except OSError as e:
         ctx.logger.error(f"Filesystem operation failed: {str(e)}")
         raise
@@ -86,21 +203,11 @@ def scaffold_django(ctx: Context, project_name: str = "myproject") -> str:
     except Exception as e:
         ctx.logger.error(f"Error creating Django project: {str(e)}")
         raise
-    finally:
-        # Clean up temporary directory
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            ctx.logger.info(f"Cleaned up temp direcotry: {temp_dir}")
-
-        # Clean up zip file
-        if final_zip_path and os.path.exists(final_zip_path):
-            os.remove(final_zip_path)
-            ctx.logger.info(f"Cleaned up zip file: {final_zip_path}")
-
-    return s3_url
 
 
-def scaffold_vite(ctx: Context, vite_config: ViteConfig) -> str | None:
+def scaffold_vite(
+    ctx: Context, vite_config: ViteConfig, job_id: str | None = None
+) -> str | None:
     """Scaffolds a project using Vite and returns the path to the zipped project.
     Supports various templates/frameworks including React, Vue, Svelte, Preact, Solid, Svelte, Qwik, Lit and Vanilla JavaScript/TypeScript.
 
@@ -108,6 +215,7 @@ def scaffold_vite(ctx: Context, vite_config: ViteConfig) -> str | None:
         ctx (Context): The agent context object.
         vite_config (ViteConfig): Configuration object containing project settings
                             including template choice and package manager.
+        job_id (str, optional): Request whose progress log receives build events.
 
     Returns:
         str: Path to the zipped project
@@ -117,18 +225,20 @@ def scaffold_vite(ctx: Context, vite_config: ViteConfig) -> str | None:
         subprocess.CalledProcessError: If the command to create the Vite project fails.
         Exception: If any error occurs during the project creation or zipping process.
     """
-    try:
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
-
-        project_name = vite_config.project_name.replace(" ", "-")
+    project_name = vite_config.project_name.replace(" ", "-")
+    vite_version = toolchain.get("create-vite")
 
-        # Create app using Vite
+    def generate(sandbox: Sandbox, temp_dir: str) -> None:
+        # Create app using Vite, pinned to the cached create-vite version for npm
         em_dashes = "--" if vite_config.package_manager == "npm" else ""
-        subprocess.run(
-            f"no '' | {vite_config.package_manager} create vite{'@latest' if vite_config.package_manager == 'npm' else ''} {project_name} {em_dashes} --template {vite_config.template} --no-rolldown",
-            shell=True,
-            check=True,
+        version_spec = (
+            f"@{vite_version or 'latest'}"
+            if vite_config.package_manager == "npm"
+            else ""
+        )
+        progress.stage(job_id, "installing")
+        sandbox.run(
+            f"no '' | {vite_config.package_manager} create vite{version_spec} {project_name} {em_dashes} --template {vite_config.template} --no-rolldown",
             cwd=temp_dir,
             env={
                 "PATH": f"{os.environ['PATH']}:{config.NODE_PATH}:/usr/local/bin:/usr/bin",
@@ -136,16 +246,18 @@ def scaffold_vite(ctx: Context, vite_config: ViteConfig) -> str | None:
         )
         ctx.logger.info("Vite project created successfully.")
 
-        # Create zip file
-        zip_path = create_zip_file(ctx, temp_dir, vite_config.project_name)
-        directory = "/tmp"
-        final_zip_path = move_zip_file(
-            ctx, zip_path, directory, vite_config.project_name
+    try:
+        return build_project(
+            ctx,
+            job_id,
+            project_name,
+            asdict(vite_config),
+            toolchain_metadata(
+                "create-vite",
+                vite_version if vite_config.package_manager == "npm" else None,
+            ),
+            generate,
         )
-        ctx.logger.info(f"Project zipped successfully: {final_zip_path}")
-
-        s3_url = upload_to_s3(ctx, final_zip_path, vite_config.project_name)
-        ctx.logger.info(f"Project uploaded successfully: {s3_url}")
     except OSError as e:
         ctx.logger.error(f"Filesystem operation failed: {str(e)}")
         raise
@@ -155,26 +267,17 @@ def scaffold_vite(ctx: Context, vite_config: ViteConfig) -> str | None:
     except Exception as e:
         ctx.logger.error(f"Error creating Vite project: {str(e)}")
         raise
-    finally:
-        # Clean up temporary directory
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            ctx.logger.info(f"Cleaned up temp direcotry: {temp_dir}")
-
-        # Clean up zip file
-        if final_zip_path and os.path.exists(final_zip_path):
-            os.remove(final_zip_path)
-            ctx.logger.info(f"Cleaned up zip file: {final_zip_path}")
 
-    return s3_url
 
-
-def scaffold_composer(ctx: Context, composer_config: ComposerConfig) -> str:
+def scaffold_composer(
+    ctx: Context, composer_config: ComposerConfig, job_id: str | None = None
+) -> str:
     """Scaffolds various PHP projects using Composer and returns the path to the zipped project.
 
     Args:
         ctx (Context): The agent context object.
         composer_config (ComposerConfig): Configuration object for the PHP project.
+        job_id (str, optional): Request whose progress log receives build events.
 
     Returns:
         str: Path to the zipped project.
@@ -184,11 +287,12 @@ def scaffold_composer(ctx: Context, composer_config: ComposerConfig) -> str:
         subprocess.CalledProcessError: If the command to create the Composer project fails.
         Exception: If any error occurs during the project creation or zipping process.
     """
-    try:
-        temp_dir = tempfile.mkdtemp()
-
-        project_name = composer_config.project_name.replace(" ", "-")
+    project_name = composer_config.project_name.replace(" ", "-")
+    package, options = COMPOSER_PACKAGES[composer_config.template]
+    composer_version = toolchain.get(package)
+    metadata = toolchain_metadata(package, composer_version)
 
+    def generate(sandbox: Sandbox, temp_dir: str) -> None:
         # Set environment variables for Composer
         env = os.environ.copy()
         env.update(
@@ -198,25 +302,18 @@ def scaffold_composer(ctx: Context, composer_config: ComposerConfig) -> str:
             }
         )
 
-        # Create commands for different project types
-        create_commands = {
-            "laravel": f"composer create-project --prefer-dist laravel/laravel {project_name}",
-            "symfony": f"composer create-project symfony/skeleton {project_name}",
-            "drupal": f"composer create-project drupal/recommended-project {project_name}",
-            "wordpress": f"composer create-project roots/bedrock {project_name}",
-            "cakephp": f"composer create-project --prefer-dist cakephp/app {project_name}",
-            "phpbb": f"composer create-project phpbb/phpbb {project_name}",
-            "magento": f"composer create-project --repository-url=https://repo.magento.com/ magento/project-community-edition {project_name}",
-            "joomla": f"composer create-project joomla/joomla-cms {project_name}",
-            "octobercms": f"composer create-project october/october {project_name}",
-            "silverstripe": f"composer create-project silverstripe/installer {project_name}",
-        }
+        # Pin the skeleton to the cached release so Composer doesn't resolve it per request
+        create_command = f"composer create-project {options} {package} {project_name}"
 
         # Create project using Composer
-        subprocess.run(
-            create_commands[composer_config.template],
-            shell=True,
-            check=True,
+        progress.stage(job_id, "installing")
+        run_pinned(
+            ctx,
+            sandbox,
+            f"{create_command} {composer_version}" if composer_version else None,
+            create_command,
+            metadata,
+            leftover=os.path.join(temp_dir, project_name),
             cwd=temp_dir,
             env=env,
         )
@@ -224,14 +321,15 @@ def scaffold_composer(ctx: Context, composer_config: ComposerConfig) -> str:
             f"{composer_config.template.capitalize()} project created successfully."
         )
 
-        # Create zip file
-        zip_path = create_zip_file(ctx, temp_dir, project_name)
-        directory = "/tmp"
-        final_zip_path = move_zip_file(ctx, zip_path, directory, project_name)
-        ctx.logger.info(f"Project zipped successfully: {final_zip_path}")
-
-        s3_url = upload_to_s3(ctx, final_zip_path, project_name)
-        ctx.logger.info(f"Project uploaded successfully: {s3_url}")
+    try:
+        return build_project(
+            ctx,
+            job_id,
+            project_name,
+            asdict(composer_config),
+            metadata,
+            generate,
+        )
     except OSError as e:
         ctx.logger.error(f"Filesystem operation failed: {str(e)}")
         raise
@@ -241,26 +339,17 @@ def scaffold_composer(ctx: Context, composer_config: ComposerConfig) -> str:
     except Exception as e:
         ctx.logger.error(f"Error creating PHP project: {str(e)}")
         raise
-    finally:
-        # Clean up temporary directory
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            ctx.logger.info(f"Cleaned up temp direcotry: {temp_dir}")
-
-        # Clean up zip file
-        if final_zip_path and os.path.exists(final_zip_path):
-            os.remove(final_zip_path)
-            ctx.logger.info(f"Cleaned up zip file: {final_zip_path}")
-
-    return s3_url
 
 
-def scaffold_rails(ctx: Context, project_name: str = "myproject") -> str:
+def scaffold_rails(
+    ctx: Context, project_name: str = "myproject", job_id: str | None = None
+) -> str:
     """Scaffolds a Ruby on Rails project and returns the path to the zipped project.
 
     Args:
         ctx (Context): The agent context object.
         project_name (str, optional): Name of the Rails project. Defaults to "myproject".
+        job_id (str, optional): Request whose progress log receives build events.
 
     Returns:
         str: Path to the zipped project.
@@ -270,11 +359,10 @@ def scaffold_rails(ctx: Context, project_name: str = "myproject") -> str:
         subprocess.CalledProcessError: If the command to create the Rails project fails.
         Exception: If any error occurs during the project creation or zipping process.
     """
-    try:
-        temp_dir = tempfile.mkdtemp()
-
-        project_name = project_name.replace(" ", "-")
+    project_name = project_name.replace(" ", "-")
+    rails_version = toolchain.get("rails")
 
+    def generate(sandbox: Sandbox, temp_dir: str) -> None:
         env = os.environ.copy()
         env.update(
             {
@@ -284,20 +372,25 @@ def scaffold_rails(ctx: Context, project_name: str = "myproject") -> str:
             }
         )
 
-        # Create Rails project
-        subprocess.run(
-            f"rails new {project_name}", shell=True, check=True, cwd=temp_dir, env=env
+        # Create Rails project with the pinned gem version
+        version_spec = f"_{rails_version}_ " if rails_version else ""
+        progress.stage(job_id, "installing")
+        sandbox.run(
+            f"rails {version_spec}new {project_name}",
+            cwd=temp_dir,
+            env=env,
         )
         ctx.logger.info("Rails project created successfully.")
 
-        # Create zip file
-        zip_path = create_zip_file(ctx, temp_dir, project_name)
-        directory = "/tmp"
-        final_zip_path = move_zip_file(ctx, zip_path, directory, project_name)
-        ctx.logger.info(f"Project zipped successfully: {final_zip_path}")
-
-        s3_url = upload_to_s3(ctx, final_zip_path, project_name)
-        ctx.logger.info(f"Project uploaded successfully: {s3_url}")
+    try:
+        return build_project(
+            ctx,
+            job_id,
+            project_name,
+            {},
+            toolchain_metadata("rails", rails_version),
+            generate,
+        )
     except OSError as e:
         ctx.logger.error(f"Filesystem operation failed: {str(e)}")
         raise
@@ -307,15 +400,3 @@ def scaffold_rails(ctx: Context, project_name: str = "myproject") -> str:
     except Exception as e:
         ctx.logger.error(f"Error creating Rails project: {str(e)}")
         raise
-    finally:
-        # Clean up temporary directory
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            ctx.logger.info(f"Cleaned up temp direcotry: {temp_dir}")
-
-        # Clean up zip file
-        if final_zip_path and os.path.exists(final_zip_path):
-            os.remove(final_zip_path)
-            ctx.logger.info(f"Cleaned up zip file: {final_zip_path}")
-
-    return s3_url
@@ -1,10 +1,19 @@
+import json
 import os
 import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 
-import boto3
-from botocore.exceptions import ClientError
 from uagents import Context
 
+from src.config import get_config
+
+config = get_config()
+
 
 def create_zip_file(ctx: Context, temp_dir: str, project_name: str) -> str:
     """Creates a zip file of the project.
@@ -58,32 +67,244 @@ def move_zip_file(
         raise
 
 
-def upload_to_s3(ctx: Context, file_path: str, file_name: str) -> str:
-    """Upload a file to an S3 bucket and return the public URL.
+class StorageBackend(ABC):
+    """Base class for the places scaffolded project archives are published to."""
+
+    @abstractmethod
+    def upload(
+        self,
+        ctx: Context,
+        file_path: str,
+        file_name: str,
+        metadata: dict[str, str] | None = None,
+    ) -> str:
+        """Publish an archive and return the URL it can be downloaded from.
+
+        Args:
+            ctx (Context): The agent context object.
+            file_path (str): Archive to publish.
+            file_name (str): Name of the published archive, without extension.
+            metadata (dict[str, str], optional): Details stored alongside the archive.
+
+        Returns:
+            str: Public URL of the published archive.
+        """
+
+    @abstractmethod
+    def purge_expired(self, ctx: Context) -> int:
+        """Delete archives older than the configured ARTIFACT_TTL.
+
+        Args:
+            ctx (Context): The agent context object.
+
+        Returns:
+            int: Number of archives deleted.
+        """
+
+
+class S3StorageBackend(StorageBackend):
+    """Publishes archives to an S3 bucket through a client shared by the whole process."""
+
+    prefix = "projects/"
+
+    def __init__(self, bucket: str):
+        # boto3 is only imported when S3 is actually used
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config as BotoConfig
+
+        self.bucket = bucket
+        self.client = boto3.Session().client(
+            service_name="s3",
+            config=BotoConfig(max_pool_connections=config.S3_MAX_CONCURRENCY),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            max_concurrency=config.S3_MAX_CONCURRENCY,
+        )
+
+    def upload(
+        self,
+        ctx: Context,
+        file_path: str,
+        file_name: str,
+        metadata: dict[str, str] | None = None,
+    ) -> str:
+        from botocore.exceptions import ClientError
+
+        object_name = f"{self.prefix}{file_name}.zip"
+        # Expiry is enforced by purge_expired; the object's Expires header only
+        # controls HTTP caching, so it isn't set here
+        extra_args = {"ACL": "public-read", "Metadata": metadata or {}}
+
+        try:
+            self.client.upload_file(
+                file_path,
+                self.bucket,
+                object_name,
+                ExtraArgs=extra_args,
+                Config=self.transfer_config,
+            )
+            url = f"https://{self.bucket}.s3.amazonaws.com/{object_name}"
+            ctx.logger.info(f"{url} uploaded to S3")
+            return url
+        except ClientError as e:
+            ctx.logger.error(f"Error uploading to S3: {e}")
+            raise
+
+    def purge_expired(self, ctx: Context) -> int:
+        from botocore.exceptions import ClientError
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=config.ARTIFACT_TTL)
+        expired = []
+
+        try:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+                expired.extend(
+                    {"Key": obj["Key"]}
+                    for obj in page.get("Contents", [])
+                    if obj["LastModified"] < cutoff
+                )
+
+            # delete_objects accepts at most 1000 keys per call
+            for i in range(0, len(expired), 1000):
+                self.client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": expired[i : i + 1000]}
+                )
+        except ClientError as e:
+            ctx.logger.error(f"Error purging expired S3 artifacts: {e}")
+            raise
+
+        return len(expired)
+
+
+class _ArtifactRequestHandler(SimpleHTTPRequestHandler):
+    """Serves individual archives by exact name, without directory listings or sidecars."""
+
+    def list_directory(self, path):
+        self.send_error(404)
+        return None
+
+    def send_head(self):
+        if not self.path.split("?", 1)[0].endswith(".zip"):
+            self.send_error(404)
+            return None
+        return super().send_head()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_artifacts(directory: str, port: int) -> ThreadingHTTPServer:
+    """Serves the archives in a directory over HTTP from a daemon thread.
+
+    Args:
+        directory (str): Directory holding the archives.
+        port (int): Port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+
+    Raises:
+        OSError: If the port can't be bound, e.g. because another server uses it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    try:
+        server = ThreadingHTTPServer(
+            ("0.0.0.0", port), partial(_ArtifactRequestHandler, directory=directory)
+        )
+    except OSError as e:
+        raise OSError(
+            e.errno, f"Cannot serve artifacts on port {port}: {e.strerror}"
+        ) from e
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class LocalStorageBackend(StorageBackend):
+    """Keeps archives on the local filesystem and serves them over HTTP from the agent process.
+
+    Under the supervisor the archives are served by the supervisor instead, once per
+    host, and workers only write them (`serve=False`).
+    """
+
+    def __init__(
+        self, directory: str, port: int, base_url: str | None = None, serve: bool = True
+    ):
+        self.directory = directory
+        self.base_url = (base_url or f"http://localhost:{port}").rstrip("/")
+        os.makedirs(self.directory, exist_ok=True)
+        self.server = serve_artifacts(directory, port) if serve else None
+
+    def upload(
+        self,
+        ctx: Context,
+        file_path: str,
+        file_name: str,
+        metadata: dict[str, str] | None = None,
+    ) -> str:
+        try:
+            # The archive is disposable once published, so a rename is enough
+            shutil.move(file_path, os.path.join(self.directory, f"{file_name}.zip"))
+            if metadata:
+                with open(os.path.join(self.directory, f"{file_name}.json"), "w") as f:
+                    json.dump(metadata, f)
+            url = f"{self.base_url}/{file_name}.zip"
+            ctx.logger.info(f"{url} stored locally")
+            return url
+        except OSError as e:
+            ctx.logger.error(f"Error storing artifact locally: {e}")
+            raise
+
+    def purge_expired(self, ctx: Context) -> int:
+        cutoff = time.time() - config.ARTIFACT_TTL
+        purged = 0
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.remove(entry.path)
+                        purged += 1
+                    except FileNotFoundError:
+                        pass
+
+        return purged
+
+
+@lru_cache
+def get_storage_backend() -> StorageBackend:
+    if config.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(
+            config.LOCAL_STORAGE_DIR,
+            config.LOCAL_STORAGE_PORT,
+            config.LOCAL_STORAGE_URL,
+            config.LOCAL_STORAGE_SERVE,
+        )
+    return S3StorageBackend(config.S3_BUCKET)
+
+
+def upload_artifact(
+    ctx: Context,
+    file_path: str,
+    file_name: str,
+    metadata: dict[str, str] | None = None,
+) -> str:
+    """Publish a file through the configured storage backend and return its public URL.
 
     Args:
         ctx (Context): The agent context object.
         file_path (str): File to upload.
-        file_name (str): S3 object file name.
+        file_name (str): Published file name, without the .zip extension.
+        metadata (dict[str, str], optional): Details stored alongside the file,
+            e.g. the scaffolder version that produced it.
 
     Returns:
         str: Public URL of the uploaded file if successful.
 
     Raises:
-        ClientError: If the upload fails.
+        ClientError: If the S3 upload fails.
+        OSError: If storing the file locally fails.
     """
-    session = boto3.Session()
-    s3_client = session.client(service_name="s3")
-
-    try:
-        bucket = "forge-projects"
-        object_name = f"projects/{file_name}.zip"
-        s3_client.upload_file(
-            file_path, bucket, object_name, ExtraArgs={"ACL": "public-read"}
-        )
-        url = f"https://{bucket}.s3.amazonaws.com/{object_name}"
-        ctx.logger.info(f"{url} uploaded to S3")
-        return url
-    except ClientError as e:
-        ctx.logger.error(f"Error uploading to S3: {e}")
-        raise
+    return get_storage_backend().upload(ctx, file_path, file_name, metadata)
@@ -0,0 +1,179 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+from src.config import get_config
+from src.sandbox import PACKAGE_CACHE_DIR, directory_size
+from src.store import SharedStore, get_shared_store
+
+config = get_config()
+
+TRASH_DIR = ".trash"
+
+
+class WorkspaceFull(OSError):
+    """Raised when starting a build would take the workspace root over its size budget."""
+
+    def __init__(self, usage_mb: float, budget_mb: int):
+        self.usage_mb = usage_mb
+        self.budget_mb = budget_mb
+        super().__init__(
+            f"Build workspace is full ({usage_mb:.0f}MB of {budget_mb}MB). Please try again shortly."
+        )
+
+
+class WorkspaceManager:
+    """Hands out build directories under one root and deletes released ones in the background.
+
+    Releasing a directory only renames it into a trash folder on the same filesystem,
+    which is instant; a daemon thread removes the trash and periodically measures the
+    root's disk usage, so neither cost lands on a request. Pointing the root at a tmpfs
+    mount keeps build I/O off the disk entirely, bounded by the size budget.
+
+    A root that is its own mount is measured from the filesystem's counters. Otherwise
+    the tree is walked, and with a shared store only one worker per host walks it and
+    publishes the result for the others.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        budget_mb: int | None,
+        check_interval: float,
+        store: SharedStore | None = None,
+    ):
+        self.root = root
+        self.budget_mb = budget_mb
+        self.check_interval = check_interval
+        self.store = store
+        self.trash = os.path.join(self.root, TRASH_DIR)
+        self.cache = os.path.join(self.root, PACKAGE_CACHE_DIR)
+        os.makedirs(self.trash, exist_ok=True)
+
+        self.usage_mb = 0.0
+        self.wakeup = threading.Event()
+        # Trash left by a crash is collected on the cleaner's first pass
+        threading.Thread(target=self.clean_forever, daemon=True).start()
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def discard(self, path: str) -> None:
+        """Releases a file or directory for background deletion."""
+        try:
+            os.rename(path, os.path.join(self.trash, uuid.uuid4().hex))
+        except FileNotFoundError:
+            return
+        except OSError:
+            # Not on the workspace filesystem, so it can't be moved to the trash
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            return
+        self.wakeup.set()
+
+    def clean(self) -> None:
+        with os.scandir(self.trash) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def measure(self) -> None:
+        """Updates the root's measured disk usage."""
+        if os.path.ismount(self.root):
+            self.usage_mb = shutil.disk_usage(self.root).used / 1024 / 1024
+        elif self.store is None:
+            self.usage_mb = directory_size(self.root) / 1024 / 1024
+        elif self.store.claim("lease:workspace_usage", self.check_interval * 1.5):
+            self.usage_mb = directory_size(self.root) / 1024 / 1024
+            self.store.set("workspace:usage_mb", self.usage_mb, self.check_interval * 3)
+        else:
+            usage_mb = self.store.get("workspace:usage_mb")
+            if usage_mb is not None:
+                self.usage_mb = usage_mb
+
+    def clean_forever(self) -> None:
+        measured_at = None
+        while True:
+            self.clean()
+            # Released directories wake the cleaner, but the root is only measured
+            # every check_interval
+            if (
+                measured_at is None
+                or time.monotonic() - measured_at >= self.check_interval
+            ):
+                self.measure()
+                measured_at = time.monotonic()
+            self.wakeup.wait(self.check_interval - (time.monotonic() - measured_at))
+            self.wakeup.clear()
+
+    def trim_cache(self, budget_mb: int | None) -> int:
+        """Deletes the least recently used package cache files until the cache fits its budget.
+
+        Package managers treat a missing cache entry as a miss and download it again,
+        so files can go while builds are using the cache.
+
+        Returns:
+            int: The number of files deleted.
+        """
+        if not budget_mb:
+            return 0
+
+        files, total = [], 0
+        for root, _, names in os.walk(self.cache):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.lstat(path)
+                except OSError:
+                    continue
+                size = stat.st_blocks * 512
+                total += size
+                files.append((max(stat.st_atime, stat.st_mtime), size, path))
+
+        deleted = 0
+        budget = budget_mb * 1024 * 1024
+        for _, size, path in sorted(files):
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+        return deleted
+
+    def over_budget(self) -> bool:
+        return bool(self.budget_mb) and self.usage_mb >= self.budget_mb
+
+    def check_budget(self) -> None:
+        """Raises WorkspaceFull if the root is at or over its size budget."""
+        if self.over_budget():
+            raise WorkspaceFull(self.usage_mb, self.budget_mb)
+
+    def report(self) -> dict[str, float]:
+        """Returns the root's last measured usage and the free space on its filesystem, in MB."""
+        return {
+            "used_mb": self.usage_mb,
+            "free_mb": shutil.disk_usage(self.root).free / 1024 / 1024,
+        }
+
+
+@lru_cache
+def get_workspace_manager() -> WorkspaceManager:
+    return WorkspaceManager(
+        config.WORKSPACE_ROOT,
+        config.WORKSPACE_BUDGET_MB,
+        config.WORKSPACE_CHECK_INTERVAL,
+        store=get_shared_store(),
+    )
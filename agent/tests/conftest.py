@@ -0,0 +1,54 @@
+import logging
+import os
+import tempfile
+
+# src.config reads the environment when it is first imported, so point everything at
+# throwaway locations before any test module imports src
+root = tempfile.mkdtemp(prefix="forge-tests-")
+os.environ.update(
+    {
+        "ENV_FILE": os.devnull,
+        "OPENAI_API_KEY": "test",
+        "HOME_PATH": root,
+        "GEM_PATH": root,
+        "GEM_HOME": root,
+        "RUBY_PATH": root,
+        "NODE_PATH": root,
+        "STORAGE_BACKEND": "local",
+        "LOCAL_STORAGE_DIR": os.path.join(root, "artifacts"),
+        "LOCAL_STORAGE_SERVE": "false",
+        "WORKSPACE_ROOT": os.path.join(root, "workspaces"),
+        "SANDBOX_CHECK_INTERVAL": "0.1",
+    }
+)
+os.environ.pop("SHARED_STORE_PATH", None)
+
+import pytest  # noqa: E402
+
+from src.checkpoints import CheckpointStore  # noqa: E402
+from src.store import SharedStore  # noqa: E402
+from src.workspace import WorkspaceManager  # noqa: E402
+
+
+class Context:
+    logger = logging.getLogger("tests")
+
+
+@pytest.fixture
+def ctx() -> Context:
+    return Context()
+
+
+@pytest.fixture
+def store(tmp_path) -> SharedStore:
+    return SharedStore(str(tmp_path / "store.db"))
+
+
+@pytest.fixture
+def workspace(tmp_path) -> WorkspaceManager:
+    return WorkspaceManager(str(tmp_path / "workspaces"), None, 60)
+
+
+@pytest.fixture
+def checkpoints(workspace) -> CheckpointStore:
+    return CheckpointStore(workspace, ttl=60)
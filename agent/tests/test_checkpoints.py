@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src import tools
+
+PARAMS = {"project_name": "blog", "template": "laravel"}
+
+
+def archive(checkpoints, checkpoint) -> str:
+    path = os.path.join(checkpoint.directory, "blog.zip")
+    with open(path, "w") as f:
+        f.write("zip")
+    checkpoints.complete(checkpoint, "archive", archive=path)
+    return path
+
+
+def test_new_request_starts_from_scratch(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, "req", PARAMS)
+    assert checkpoint.stage is None
+    assert os.path.isdir(checkpoints.workdir(checkpoint.directory))
+
+
+def test_resumes_after_generate(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, "req", PARAMS)
+    checkpoints.complete(checkpoint, "generate")
+
+    resumed = checkpoints.open(ctx, "req", PARAMS)
+    assert resumed.stage == "generate"
+    assert checkpoints.done(resumed, "generate")
+    assert not checkpoints.done(resumed, "archive")
+
+
+def test_resumes_after_archive(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, "req", PARAMS)
+    checkpoints.complete(checkpoint, "generate")
+    path = archive(checkpoints, checkpoint)
+
+    resumed = checkpoints.open(ctx, "req", PARAMS)
+    assert resumed.stage == "archive"
+    assert resumed.archive == path
+
+
+def test_resumes_after_upload(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, "req", PARAMS)
+    checkpoints.complete(checkpoint, "generate")
+    archive(checkpoints, checkpoint)
+    checkpoints.complete(checkpoint, "upload", url="https://example.com/blog.zip")
+    checkpoints.release(ctx, checkpoint, retryable=True)
+
+    resumed = checkpoints.open(ctx, "req", PARAMS)
+    assert resumed.stage == "upload"
+    assert resumed.url == "https://example.com/blog.zip"
+
+
+def test_different_params_rebuild(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, "req", PARAMS)
+    checkpoints.complete(checkpoint, "generate")
+
+    rebuilt = checkpoints.open(ctx, "req", {**PARAMS, "template": "symfony"})
+    assert rebuilt.stage is None
+
+
+def test_missing_outputs_invalidate_the_checkpoint(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, "req", PARAMS)
+    checkpoints.complete(checkpoint, "generate")
+    path = archive(checkpoints, checkpoint)
+    os.remove(path)
+
+    assert checkpoints.open(ctx, "req", PARAMS).stage is None
+
+
+def test_requests_without_an_id_never_resume(ctx, checkpoints):
+    checkpoint = checkpoints.open(ctx, None, PARAMS)
+    checkpoints.complete(checkpoint, "generate")
+    assert checkpoints.open(ctx, None, PARAMS).stage is None
+
+
+def test_evict_drops_failed_builds_oldest_first(ctx, checkpoints, workspace):
+    old = checkpoints.open(ctx, "old", PARAMS)
+    checkpoints.complete(old, "generate")
+    past = time.time() - 100
+    os.utime(os.path.join(old.directory, "state.json"), (past, past))
+    new = checkpoints.open(ctx, "new", PARAMS)
+    checkpoints.complete(new, "generate")
+
+    workspace.budget_mb = 1
+    workspace.usage_mb = 1.0
+    checkpoints.evict(ctx)
+    assert not os.path.exists(old.directory)
+    assert os.path.exists(new.directory)
+
+
+def test_decisions_are_remembered_per_request(checkpoints):
+    decision = {"action": "scaffold_django", "project_name": "blog"}
+    checkpoints.remember_decision("req", decision)
+    assert checkpoints.recall_decision("req") == decision
+    assert checkpoints.recall_decision("other") is None
+    assert checkpoints.recall_decision(None) is None
+
+
+@pytest.fixture
+def build(monkeypatch, checkpoints):
+    """Runs build_project against the test's checkpoint store, counting each stage."""
+    monkeypatch.setattr(tools, "checkpoints", checkpoints)
+    calls = {"generate": 0, "upload": []}
+
+    def upload(ctx, path, project_name, metadata):
+        calls["upload"].append(path)
+        if len(calls["upload"]) == 1 and calls.get("fail_upload"):
+            raise ConnectionError("upload failed")
+        return f"https://example.com/{project_name}.zip"
+
+    monkeypatch.setattr(tools, "upload_artifact", upload)
+
+    def generate(sandbox, workdir):
+        calls["generate"] += 1
+        time.sleep(0.2)
+        os.makedirs(os.path.join(workdir, "blog"))
+        with open(os.path.join(workdir, "blog", "README"), "w") as f:
+            f.write("blog")
+
+    def run(ctx, job_id):
+        return tools.build_project(ctx, job_id, "blog", {}, {}, generate)
+
+    run.calls = calls
+    return run
+
+
+def test_retry_after_failed_upload_reuses_the_archive(ctx, build):
+    build.calls["fail_upload"] = True
+    with pytest.raises(ConnectionError):
+        build(ctx, "req")
+
+    assert build(ctx, "req") == "https://example.com/blog.zip"
+    assert build.calls["generate"] == 1
+    first, second = build.calls["upload"]
+    assert first == second
+
+
+def test_duplicate_in_flight_request_waits_for_the_build(ctx, build):
+    urls = []
+    threads = [
+        threading.Thread(target=lambda: urls.append(build(ctx, "req")))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert urls == ["https://example.com/blog.zip"] * 3
+    assert build.calls["generate"] == 1
+    assert len(build.calls["upload"]) == 1
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+from src.dataclasses import BuildJob
+from src.scheduler import BuildQueueFull, BuildScheduler, mark_built
+
+
+def scheduler(**kwargs) -> BuildScheduler:
+    options = {
+        "concurrency": 1,
+        "toolchain_caps": {},
+        "aging_rate": 0.0,
+        "max_queue_wait": 1000.0,
+    }
+    return BuildScheduler(**{**options, **kwargs})
+
+
+def job(toolchain: str, cost: float, waited: float = 0.0) -> BuildJob:
+    return BuildJob(
+        toolchain=toolchain,
+        template=toolchain,
+        estimated_cost=cost,
+        submitted_at=time.monotonic() - waited,
+    )
+
+
+def running(toolchain: str, cost: float) -> BuildJob:
+    started = job(toolchain, cost)
+    started.started_at = time.monotonic()
+    return started
+
+
+def test_dispatch_starts_the_cheapest_job_first():
+    s = scheduler()
+    slow, fast = job("rails", 240), job("vite", 20)
+    s.pending += [slow, fast]
+    s.dispatch()
+    assert s.running == [fast]
+    assert fast.ready.is_set() and not slow.ready.is_set()
+
+
+def test_dispatch_ages_long_waiting_jobs_ahead():
+    s = scheduler(aging_rate=1.0)
+    slow, fast = job("rails", 240, waited=300), job("vite", 20)
+    s.pending += [fast, slow]
+    s.dispatch()
+    assert s.running == [slow]
+
+
+def test_dispatch_skips_toolchains_at_their_cap():
+    s = scheduler(concurrency=4, toolchain_caps={"composer": 1})
+    s.running.append(running("composer", 600))
+    composer, rails = job("composer", 60), job("rails", 240)
+    s.pending += [composer, rails]
+    s.dispatch()
+    assert rails in s.running
+    assert s.pending == [composer]
+
+
+def test_estimated_wait_is_zero_with_free_capacity():
+    s = scheduler(concurrency=2)
+    s.running.append(running("vite", 20))
+    assert s.estimated_wait("django", 45) == 0
+
+
+def test_estimated_wait_counts_running_and_cheaper_queued_work():
+    s = scheduler()
+    s.running.append(running("rails", 240))
+    s.pending += [job("vite", 20), job("composer", 600)]
+    assert s.estimated_wait("django", 45) == pytest.approx(260, abs=1)
+
+
+def test_estimated_wait_counts_capped_toolchain_work():
+    # Free global capacity doesn't help a job whose toolchain is at its cap
+    s = scheduler(concurrency=4, toolchain_caps={"composer": 1})
+    s.running.append(running("composer", 600))
+    s.pending.append(job("composer", 300))
+    assert s.estimated_wait("composer", 60) == pytest.approx(900, abs=1)
+    assert s.estimated_wait("vite", 20) == 0
+
+
+def test_estimated_wait_counts_capped_work_on_other_workers(ctx, store):
+    def build():
+        time.sleep(0.5)
+
+    async def main():
+        worker_0 = scheduler(concurrency=4, toolchain_caps={"composer": 1}, store=store)
+        worker_1 = scheduler(
+            concurrency=4,
+            toolchain_caps={"composer": 1},
+            max_queue_wait=100.0,
+            store=store,
+        )
+        first = asyncio.create_task(worker_0.run(ctx, "composer", "magento", build))
+        await asyncio.sleep(0.1)
+        with pytest.raises(BuildQueueFull):
+            await worker_1.run(ctx, "composer", "laravel", build)
+        await first
+
+    asyncio.run(main())
+    assert store.jobs("toolchain:composer") == []
+
+
+def test_run_sheds_jobs_that_would_wait_too_long(ctx):
+    s = scheduler(max_queue_wait=100.0)
+    s.running.append(running("rails", 240))
+    with pytest.raises(BuildQueueFull) as error:
+        asyncio.run(s.run(ctx, "vite", "react", lambda: None))
+    assert error.value.estimated_wait > 100
+
+
+def test_run_returns_the_result_and_frees_the_slot(ctx):
+    s = scheduler()
+    assert asyncio.run(s.run(ctx, "vite", "react", lambda: "url")) == "url"
+    assert s.running == [] and s.pending == []
+
+
+def test_only_built_jobs_are_timed(ctx):
+    def build():
+        mark_built()
+        time.sleep(0.2)
+
+    async def main(s):
+        await s.run(ctx, "composer", "magento", build)
+        # A checkpoint hit returns at once and must not drag the average down
+        await s.run(ctx, "composer", "magento", lambda: "url")
+
+    s = scheduler()
+    asyncio.run(main(s))
+    assert s.estimate("composer", "magento") == pytest.approx(0.2, abs=0.1)
+
+
+def test_host_wide_caps_serialise_jobs_across_workers(ctx, store):
+    spans = []
+
+    def build():
+        started = time.monotonic()
+        time.sleep(0.3)
+        spans.append((started, time.monotonic()))
+
+    async def main():
+        workers = [
+            scheduler(concurrency=4, toolchain_caps={"composer": 1}, store=store)
+            for _ in range(2)
+        ]
+        await asyncio.gather(
+            *(w.run(ctx, "composer", "laravel", build) for w in workers)
+        )
+
+    asyncio.run(main())
+    (_, first_end), (second_start, _) = sorted(spans)
+    assert second_start >= first_end
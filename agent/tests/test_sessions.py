@@ -0,0 +1,35 @@
+import pytest
+
+from src.sessions import SessionStore, SharedSessionStore
+
+OPTIONS = {"max_sessions": 10, "ttl": 60, "recent_turns": 2, "token_budget": 200}
+
+TURN = {"action": "scaffold_django", "action_args": {"project_name": "blog"}}
+
+
+@pytest.fixture(params=["memory", "shared"])
+def sessions(request, store) -> SessionStore:
+    if request.param == "shared":
+        return SharedSessionStore(store, **OPTIONS)
+    return SessionStore(**OPTIONS)
+
+
+def test_record_keeps_recent_turns_verbatim(sessions):
+    for i in range(5):
+        sessions.record("s", f"make project {i}", TURN)
+    session = sessions.get("s")
+    assert [turn.user_input for turn in session.turns] == [
+        "make project 3",
+        "make project 4",
+    ]
+    assert "make project 2" in session.summary[-1]
+
+
+def test_record_trims_the_summary_to_the_budget(sessions):
+    for i in range(200):
+        sessions.record("s", f"make project {i}", TURN)
+    session = sessions.get("s")
+    summary, _ = sessions.fit(session)
+    # Only what can ever be rendered is stored
+    assert len(session.summary) == len(summary) < 20
+    assert "make project 197" in sessions.render("s")
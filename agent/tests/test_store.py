@@ -0,0 +1,84 @@
+import subprocess
+import sys
+
+from src import store as store_module
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_acquire_slot_respects_limit(store):
+    assert store.acquire_slot("toolchain:composer", 2, "a")
+    assert store.acquire_slot("toolchain:composer", 2, "b")
+    assert not store.acquire_slot("toolchain:composer", 2, "c")
+    # Other keys have their own slots
+    assert store.acquire_slot("toolchain:rails", 1, "c")
+
+
+def test_release_slot_frees_it(store):
+    assert store.acquire_slot("toolchain:composer", 1, "a")
+    assert not store.acquire_slot("toolchain:composer", 1, "b")
+    store.release_slot("toolchain:composer", "a")
+    assert store.acquire_slot("toolchain:composer", 1, "b")
+
+
+def test_acquire_slot_reclaims_slots_of_dead_processes(store):
+    store.connection().execute(
+        "INSERT INTO slots (key, owner, pid) VALUES (?, ?, ?)",
+        ("toolchain:composer", "crashed", dead_pid()),
+    )
+    assert store.acquire_slot("toolchain:composer", 1, "a")
+
+
+def test_hit_counts_within_a_window(store, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(store_module.time, "time", lambda: now)
+    assert [store.hit("ratelimit:chat", 60) for _ in range(3)] == [1, 2, 3]
+    # Keys are counted separately
+    assert store.hit("ratelimit:progress", 60) == 1
+
+
+def test_hit_starts_over_in_the_next_window(store, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(store_module.time, "time", lambda: now)
+    store.hit("ratelimit:chat", 60)
+    store.hit("ratelimit:chat", 60)
+    now = 1080.0
+    assert store.hit("ratelimit:chat", 60) == 1
+
+
+def test_claim_is_exclusive_until_it_expires(store, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(store_module.time, "time", lambda: now)
+    store.connection().execute(
+        "INSERT INTO kv (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+        ("lease:refresh", str(dead_pid()), now, now + 30),
+    )
+    assert not store.claim("lease:refresh", 30)
+    now = 1031.0
+    assert store.claim("lease:refresh", 30)
+    # The holder keeps renewing its own lease
+    assert store.claim("lease:refresh", 30)
+
+
+def test_append_many_assigns_sequential_seqs_and_trims(store):
+    assert store.append_many("progress:a", ["one", "two"], maxlen=3) == 2
+    assert store.append("progress:a", "three", maxlen=3) == 3
+    assert store.append_many("progress:a", ["four"], maxlen=3) == 4
+    assert store.read("progress:a", 0) == [(2, "two"), (3, "three"), (4, "four")]
+    assert store.read("progress:a", 3) == [(4, "four")]
+
+
+def test_jobs_tracks_queued_and_started_jobs(store):
+    store.add_job("toolchain:composer", "a", 600.0)
+    store.add_job("toolchain:composer", "b", 300.0)
+    store.start_job("toolchain:composer", "a")
+    jobs = dict(store.jobs("toolchain:composer"))
+    assert jobs[300.0] is None
+    assert jobs[600.0] is not None
+
+    store.remove_job("toolchain:composer", "a")
+    assert store.jobs("toolchain:composer") == [(300.0, None)]
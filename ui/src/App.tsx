@@ -11,12 +11,52 @@ import {
 import { Dropdown, Button, message } from "antd";
 import { Squeeze as Hamburger } from "hamburger-react";
 import useSWRMutation from "swr/mutation";
-import { APIResponse, Message, DownloadDetails } from "./types";
+import {
+  APIResponse,
+  Message,
+  DownloadDetails,
+  ProgressResponse,
+} from "./types";
 import { useTheme } from "./hooks";
 import MessageItem from "./components/MessageItem";
 import send from "./assets/send.png";
 import stop from "./assets/stop.png";
 
+const followProgress = async (
+  url: string,
+  requestId: string,
+  signal: AbortSignal,
+  onProgress: (text: string) => void
+) => {
+  let cursor = 0;
+  let stage = "";
+  while (!signal.aborted) {
+    const response = await fetch(url, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ request_id: requestId, cursor }),
+      signal,
+    });
+    const progress = (await response.json()) as ProgressResponse;
+    cursor = progress.cursor;
+    for (const event of progress.events) {
+      if (event.kind === "stage") {
+        stage = event.message.charAt(0).toUpperCase() + event.message.slice(1);
+        onProgress(`${stage}...`);
+      } else {
+        onProgress(`${stage}: ${event.message}`);
+      }
+    }
+    if (progress.done) {
+      // A retry's first poll can still see the previous attempt's closed log, so keep
+      // following until the chat request itself finishes and aborts the signal
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  }
+};
+
 const chatWithAgent = async (
   url: string,
   {
@@ -24,23 +64,41 @@ const chatWithAgent = async (
   }: {
     arg: {
       query: string;
+      sessionId: string;
+      requestId: string;
       getter: Message[];
       setter: (arg: Message[]) => void;
       downloadDetails: DownloadDetails;
       setDownloadDetails: (arg: DownloadDetails) => void;
       setCanTrigger: (arg: boolean) => void;
+      setProgress: (arg: string) => void;
       abortController: React.RefObject<AbortController | null>;
     };
   }
 ) => {
+  const progressController = new AbortController();
   try {
     arg.abortController.current = new AbortController();
+    arg.abortController.current.signal.addEventListener("abort", () =>
+      progressController.abort()
+    );
+    // Stream build progress into the pending message while the chat request runs
+    followProgress(
+      url.replace(/\/chat$/, "/progress"),
+      arg.requestId,
+      progressController.signal,
+      arg.setProgress
+    ).catch(() => undefined);
     const response = await fetch(url, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({ query: arg.query }),
+      body: JSON.stringify({
+        query: arg.query,
+        session_id: arg.sessionId,
+        request_id: arg.requestId,
+      }),
       signal: arg.abortController.current.signal,
     });
     const jsonResponse = (await response.json()) as APIResponse;
@@ -57,6 +115,7 @@ const chatWithAgent = async (
       ...messages[messages.length - 1],
       id: Date.now(),
       text: jsonResponse.message,
+      failed: jsonResponse.status === "error",
     };
     arg.setter(messages);
     arg.setCanTrigger(false);
@@ -65,8 +124,19 @@ const chatWithAgent = async (
       console.log("Fetch aborted");
     } else {
       message.error(`An error occurred: ${err as Error}`);
+      const messages = [...arg.getter];
+      messages[messages.length - 1] = {
+        ...messages[messages.length - 1],
+        id: Date.now(),
+        text: "The request failed.",
+        failed: true,
+      };
+      arg.setter(messages);
+      arg.setCanTrigger(false);
     }
   } finally {
+    progressController.abort();
+    arg.setProgress("");
     arg.abortController.current = null;
   }
 };
@@ -77,6 +147,7 @@ const ChatInterface = () => {
   const [isOpen, setOpen] = useState(false);
   const [isMobile, setMobile] = useState(false);
   const [canTrigger, setCanTrigger] = useState(false);
+  const [progress, setProgress] = useState("");
   const [downloadDetails, setDownloadDetails] = useState<DownloadDetails>({
     projectName: "",
     url: "",
@@ -84,6 +155,7 @@ const ChatInterface = () => {
   const chatEndRef = useRef<HTMLDivElement | null>(null);
   const abortController = useRef<AbortController | null>(null);
   const textareaRef = useRef<HTMLTextAreaElement | null>(null);
+  const sessionId = useRef<string>(crypto.randomUUID());
   const { trigger, isMutating } = useSWRMutation(
     `${import.meta.env.VITE_API_URL}/chat`,
     chatWithAgent,
@@ -103,7 +175,12 @@ const ChatInterface = () => {
           sender: "user",
           text: input,
         },
-        { id: Date.now(), sender: "ai", text: "" },
+        {
+          id: Date.now(),
+          sender: "ai",
+          text: "",
+          requestId: crypto.randomUUID(),
+        },
       ];
       setMessages((prev) => [...prev, ...newMessages]);
       setInput("");
@@ -113,6 +190,16 @@ const ChatInterface = () => {
     }
   }, [input]);
 
+  // Resend the last request under the same id, so the agent resumes its build
+  // instead of starting over
+  const handleRetry = useCallback(() => {
+    setMessages((prev) => [
+      ...prev.slice(0, -1),
+      { ...prev[prev.length - 1], id: Date.now(), text: "", failed: false },
+    ]);
+    setCanTrigger(true);
+  }, []);
+
   const handleKeyDown = (e: React.KeyboardEvent<HTMLTextAreaElement>) => {
     if (e.key === "Enter" && !e.shiftKey) {
       e.preventDefault();
@@ -206,11 +293,15 @@ const ChatInterface = () => {
     const triggerChat = async () => {
       await trigger({
         query: messages[messages.length - 2].text,
+        sessionId: sessionId.current,
+        requestId:
+          messages[messages.length - 1].requestId ?? crypto.randomUUID(),
         getter: messages,
         setter: setMessages,
         downloadDetails: downloadDetails,
         setDownloadDetails: setDownloadDetails,
         setCanTrigger: setCanTrigger,
+        setProgress: setProgress,
         abortController: abortController,
       });
     };
@@ -345,6 +436,8 @@ const ChatInterface = () => {
                 message={message}
                 isLastMessage={index === messages.length - 1}
                 isMutating={isMutating}
+                progress={progress}
+                onRetry={handleRetry}
               />
             ))}
             <div ref={chatEndRef} />
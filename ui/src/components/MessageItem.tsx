@@ -1,10 +1,17 @@
 import { memo } from "react";
-import { RobotOutlined } from "@ant-design/icons";
+import { RobotOutlined, ReloadOutlined } from "@ant-design/icons";
+import { Button } from "antd";
 import { MessageItemProps } from "../types";
 import TypeIt from "typeit-react";
 
 const MessageItem = memo(
-  ({ message, isLastMessage, isMutating }: MessageItemProps) => {
+  ({
+    message,
+    isLastMessage,
+    isMutating,
+    progress,
+    onRetry,
+  }: MessageItemProps) => {
     if (message.sender === "ai") {
       return (
         <div className="flex justify-start w-full">
@@ -14,11 +21,33 @@ const MessageItem = memo(
                 isLastMessage && isMutating ? "animate-spin" : ""
               } mt-1.5 flex-shrink-0`}
             />
-            <p className="m-auto max-w-[100%] break-words text-[var(--text-primary)]">
-              <TypeIt key={message.id} options={{ speed: 50, cursor: false }}>
-                {message.text}
-              </TypeIt>
-            </p>
+            <div className="m-auto max-w-[100%]">
+              <p className="break-words text-[var(--text-primary)]">
+                <TypeIt key={message.id} options={{ speed: 50, cursor: false }}>
+                  {message.text}
+                </TypeIt>
+              </p>
+              {isLastMessage && isMutating && progress && (
+                <p className="mt-1 text-xs opacity-70 break-all font-mono">
+                  {progress}
+                </p>
+              )}
+              {isLastMessage && !isMutating && message.failed && onRetry && (
+                <Button
+                  className="mt-2"
+                  size="small"
+                  icon={<ReloadOutlined />}
+                  onClick={onRetry}
+                  style={{
+                    backgroundColor: "var(--bg-primary)",
+                    color: "var(--text-primary)",
+                    borderColor: "var(--text-primary)",
+                  }}
+                >
+                  Retry
+                </Button>
+              )}
+            </div>
           </div>
         </div>
       );
@@ -2,6 +2,21 @@ export interface Message {
   id: number;
   sender: string;
   text: string;
+  // Sent as the request's idempotency key, and kept so a retry resumes the build
+  requestId?: string;
+  failed?: boolean;
+}
+
+export interface ProgressEvent {
+  seq: number;
+  kind: "stage" | "log";
+  message: string;
+}
+
+export interface ProgressResponse {
+  events: ProgressEvent[];
+  cursor: number;
+  done: boolean;
 }
 
 export interface APIResponse {
@@ -58,4 +73,6 @@ export interface MessageItemProps {
   message: Message;
   isLastMessage: boolean;
   isMutating: boolean;
+  progress?: string;
+  onRetry?: () => void;
 }